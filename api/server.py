@@ -0,0 +1,303 @@
+# api/server.py
+"""Asyncio HTTP service with warm, hot-swappable recommendation models.
+
+Endpoints:
+    GET  /health                       status and current model version
+    GET  /recommend/{customer_id}      ?top_n=N
+    GET  /similar/{product_id}         ?top_n=N&exact=1 (exact skips the ANN index)
+    POST /recommend/batch              {"customer_ids": [...], "top_n": N}
+    POST /admin/reload                 {"version": "..."} (optional; default LATEST)
+    POST /admin/invalidate/{customer_id}   drop that customer's cached results
+    GET  /stats                        cache counters and database pool metrics
+    GET  /metrics                      stage timings, counters and pool gauges as Prometheus text
+
+Scoring runs in a process pool whose workers memory-map the model artifact, so
+the event loop only parses requests, answers cache hits and writes responses.
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from database.db_utils import pool_metrics
+from models import artifacts
+from models.cache import RecommendationCache
+from models.instrumentation import metrics
+
+_worker_recsys = None
+
+
+def _init_worker(config, artifact_path):
+    global _worker_recsys
+    from models import RecommenderSystem
+
+    path = Path(artifact_path)
+    _worker_recsys = RecommenderSystem(config=config).load_models(root=path.parent, version=path.name)
+    _worker_recsys.cache = None  # results are cached once, in the serving process
+
+
+def _worker_pid(hold):
+    # held briefly, so one fast worker cannot answer every warm-up call
+    time.sleep(hold)
+    return os.getpid()
+
+
+def _call(fn, *args):
+    """Run `fn` in a worker and hand the worker's metrics back with the result."""
+    return fn(*args), metrics.drain()
+
+
+def _records(df):
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _recommend(customer_id, top_n):
+    return _records(_worker_recsys.recommend_products(customer_id, top_n=top_n))
+
+
+def _similar(product_id, top_n, exact):
+    return _records(_worker_recsys.similar_products(product_id, top_n=top_n, exact=exact))
+
+
+def _recommend_batch(customer_ids, top_n):
+    df = _worker_recsys.recommend_batch(customer_ids, top_n=top_n)
+    out = {cid: [] for cid in customer_ids}
+    for row in _records(df):
+        out[row.pop("customer_id")].append(row)
+    return [{"customer_id": cid, "recommendations": recs} for cid, recs in out.items()]
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+ROUTES = {"health", "stats", "metrics", "recommend", "similar", "admin"}
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class RecommendationService:
+    """Owns the worker pool for the current model version and swaps it on reload."""
+    def __init__(self, config, artifact_root, workers=2):
+        self.config = config
+        self.artifact_root = Path(artifact_root)
+        self.workers = workers
+        self.default_top_n = config.get("recommender", {}).get("top_n", 10)
+        self.version = None
+        self.cache = RecommendationCache.from_config(config, enabled=True)
+        self._pool = None
+        self._reload_lock = asyncio.Lock()
+
+    def _start_pool(self, path):
+        """Pool whose every worker has run its initializer, i.e. mapped the model.
+
+        Warm-up calls report the worker pid and are repeated, each round holding
+        its workers longer, until all `workers` distinct processes have answered.
+        If a worker fails to load the model (a corrupt artifact) the pool is shut
+        down before the error propagates, so failed reloads do not leak processes.
+        """
+        pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.config, str(path)))
+        try:
+            ready, hold = set(), 0.01
+            while len(ready) < self.workers:
+                ready.update(f.result() for f in [pool.submit(_worker_pid, hold) for _ in range(self.workers)])
+                hold = min(2 * hold, 1.0)
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        return pool
+
+    async def reload(self, version=None):
+        """Swap to `version` (default LATEST). In-flight requests finish on the old pool."""
+        async with self._reload_lock:
+            path = artifacts.resolve_version(self.artifact_root, version)
+            if path.name == self.version:
+                return False
+            loop = asyncio.get_running_loop()
+            pool = await loop.run_in_executor(None, self._start_pool, path)
+            old, self._pool, self.version = self._pool, pool, path.name
+            if old is not None:
+                loop.run_in_executor(None, old.shutdown, True)
+            print(f"Serving model version {self.version}")
+            return True
+
+    async def watch(self, interval):
+        """Poll LATEST and hot-swap whenever a newer artifact is published."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception as exc:  # keep serving the current model
+                print(f"Model reload failed, still serving {self.version}: {exc!r}")
+
+    async def _run(self, fn, *args):
+        result, worker_metrics = await asyncio.get_running_loop().run_in_executor(self._pool, _call, fn, *args)
+        metrics.merge(worker_metrics)
+        return result
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+
+        if parts == ["health"]:
+            return {"status": "ok", "model_version": self.version}
+        if parts == ["stats"]:
+            return {
+                "model_version": self.version,
+                "cache": self.cache.stats() if self.cache is not None else None,
+                "db_pool": pool_metrics(),
+            }
+        if parts == ["metrics"]:
+            return metrics.to_prometheus(extra_gauges=_pool_gauges())
+        if parts == ["recommend", "batch"]:
+            if method != "POST":
+                raise HttpError(405, "Use POST for batch requests.")
+            payload = _json_body(body)
+            ids = payload.get("customer_ids")
+            if not isinstance(ids, list) or not all(isinstance(c, int) for c in ids):
+                raise HttpError(400, "customer_ids must be a list of integers.")
+            top_n = _int_param(payload.get("top_n", self.default_top_n), "top_n")
+            return {"model_version": self.version, "results": await self._run(_recommend_batch, ids, top_n)}
+        if len(parts) == 2 and parts[0] == "recommend":
+            if method != "GET":
+                raise HttpError(405, "Use GET for single recommendations.")
+            cid = _int_param(parts[1], "customer_id")
+            top_n = _int_param(query.get("top_n", [self.default_top_n])[0], "top_n")
+            version = self.version
+            recs = self.cache.get(cid, top_n, version) if self.cache is not None else None
+            if recs is None:
+                recs = await self._run(_recommend, cid, top_n)
+                if self.cache is not None:
+                    self.cache.put(cid, top_n, version, recs)
+            return {"customer_id": cid, "model_version": self.version, "recommendations": recs}
+        if len(parts) == 2 and parts[0] == "similar":
+            if method != "GET":
+                raise HttpError(405, "Use GET for similar products.")
+            pid = _int_param(parts[1], "product_id")
+            top_n = _int_param(query.get("top_n", [self.default_top_n])[0], "top_n")
+            exact = query.get("exact", ["0"])[0] in ("1", "true")
+            similar = await self._run(_similar, pid, top_n, exact)
+            return {"product_id": pid, "model_version": self.version, "similar": similar}
+        if len(parts) == 3 and parts[:2] == ["admin", "invalidate"]:
+            if method != "POST":
+                raise HttpError(405, "Use POST to invalidate.")
+            cid = _int_param(parts[2], "customer_id")
+            return {"customer_id": cid, "invalidated": self.cache.invalidate_customer(cid) if self.cache is not None else 0}
+        if parts == ["admin", "reload"]:
+            if method != "POST":
+                raise HttpError(405, "Use POST to reload.")
+            version = _json_body(body).get("version") if body else None
+            try:
+                swapped = await self.reload(version)
+            except FileNotFoundError as exc:
+                raise HttpError(404, str(exc))
+            return {"model_version": self.version, "swapped": swapped}
+        raise HttpError(404, f"No route for {url.path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0) or 0)
+                body = await reader.readexactly(length) if length else b""
+
+                start = time.perf_counter()
+                try:
+                    status, payload = 200, await self.dispatch(method.upper(), target, body)
+                except HttpError as exc:
+                    status, payload = exc.status, {"error": exc.message}
+                except Exception as exc:
+                    status, payload = 500, {"error": str(exc)}
+                route = next((p for p in urlsplit(target).path.split("/") if p), "")
+                route = route if route in ROUTES else "other"  # bounded label cardinality
+                metrics.observe("http_request_seconds", time.perf_counter() - start, route=route)
+                metrics.inc("http_requests_total", route=route, status=status)
+                if isinstance(payload, str):
+                    data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+                else:
+                    data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+
+def _pool_gauges():
+    """Numeric database pool metrics as {name: {labels: value}} gauges."""
+    gauges = {}
+    for uri, values in pool_metrics().items():
+        for name, value in values.items():
+            if isinstance(value, (int, float)):
+                gauges.setdefault(f"db_pool_{name}", {})[(("engine", uri),)] = value
+    return gauges
+
+
+def _json_body(body):
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HttpError(400, "Request body must be JSON.")
+    if not isinstance(payload, dict):
+        raise HttpError(400, "Request body must be a JSON object.")
+    return payload
+
+
+def _int_param(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name} must be an integer.")
+
+
+async def _serve(service, host, port, watch_interval):
+    await service.reload()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Listening on http://{host}:{port}")
+    tasks = [asyncio.create_task(service.watch(watch_interval))] if watch_interval else []
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for t in tasks:
+            t.cancel()
+        service.shutdown()
+
+
+def serve(config, artifact_root, host="127.0.0.1", port=8000, workers=2, watch_interval=None):
+    service = RecommendationService(config, artifact_root, workers=workers)
+    try:
+        asyncio.run(_serve(service, host, port, watch_interval))
+    except KeyboardInterrupt:
+        pass
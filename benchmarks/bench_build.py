@@ -0,0 +1,120 @@
+# benchmarks/bench_build.py
+"""Parallel model build: wall time and speedup of `build_models` per worker count.
+
+The dataset is loaded once; `build_models` then runs with `build.workers` set to
+each value of --workers, recording the total build time and the content /
+collaborative stage timers. Speedup and parallel efficiency are relative to the
+first worker count (use 1). The item-item similarities of every run are checked
+against the first one, since the sharded merge must not depend on the worker count.
+
+Usage: python benchmarks/bench_build.py --scale medium --neighbors-k 50 --workers 1,2,4,8,16,32 [--output build.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from synthetic_data import SCALES, get_engine  # noqa: E402
+from models.instrumentation import metrics  # noqa: E402
+from models.recommender import RecommenderSystem  # noqa: E402
+
+STAGES = ("build.content", "build.collaborative", "build.popularity")
+
+
+def same_sims(a, b):
+    if isinstance(a, np.ndarray):
+        return np.array_equal(a, b)
+    return (np.array_equal(a.indptr, b.indptr) and np.array_equal(a.indices, b.indices)
+            and np.array_equal(a.data, b.data))
+
+
+def run(args, db_uri, workdir):
+    config = {
+        "database": {"uri": db_uri},
+        "cache": {"enabled": False},
+        "popularity": {"source": "transactions"},
+        "recommender": {"neighbors_k": args.neighbors_k},
+        "build": {"tmp_dir": str(workdir)},
+    }
+    recsys = RecommenderSystem(engine=get_engine(db_uri), config=config).load_data()
+    # import scikit-learn up front so the first timed build does not pay for it
+    import sklearn.feature_extraction.text  # noqa: F401
+    import sklearn.metrics.pairwise  # noqa: F401
+    rows, reference = [], None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        config["build"]["workers"] = workers
+        seconds = []
+        for _ in range(args.repeat):
+            metrics.reset()
+            start = time.perf_counter()
+            recsys.build_models()
+            seconds.append(time.perf_counter() - start)
+        timers = metrics.summary()["timers"]
+        sims = recsys.collab_model.item_sims
+        if reference is None:
+            reference = sims
+        rows.append({
+            "workers": workers,
+            "build_seconds": round(min(seconds), 3),
+            **{f"{stage}_seconds": round(timers[stage]["total_ms"] / 1000.0 / args.repeat, 3) for stage in STAGES},
+            "identical_to_first": same_sims(reference, sims),
+        })
+    base = rows[0]
+    for row in rows:
+        row["speedup"] = round(base["build_seconds"] / row["build_seconds"], 2)
+        row["efficiency"] = round(row["speedup"] * base["workers"] / row["workers"], 2)
+        row["collaborative_speedup"] = round(
+            base["build.collaborative_seconds"] / max(row["build.collaborative_seconds"], 1e-9), 2)
+    return {
+        "cpu_count": os.cpu_count(),
+        "dataset": {"products": len(recsys.catalog), "transactions": len(recsys.interactions)},
+        "results": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-uri", default=None, help="Benchmark an existing database instead of generating one")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--neighbors-k", type=int, default=50, help="Top-K item neighbors (None: dense similarities)")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated build.workers values, first is the baseline")
+    parser.add_argument("--repeat", type=int, default=1, help="Builds per worker count; the fastest is reported")
+    parser.add_argument("--output", default=None, help="Write the JSON results here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="recsys-build-") as tmp:
+        workdir = Path(tmp)
+        db_uri = args.db_uri
+        if db_uri is None:
+            db_uri = f"sqlite:///{workdir / 'build.db'}"
+            subprocess.run([
+                sys.executable, str(Path(__file__).with_name("synthetic_data.py")), "--scale", args.scale,
+                "--seed", str(args.seed), "--out-dir", str(workdir / "data"), "--db-uri", db_uri,
+            ], check=True, stdout=subprocess.DEVNULL)
+        results = run(args, db_uri, workdir)
+
+    print(f"cpus={results['cpu_count']}  products={results['dataset']['products']}  "
+          f"transactions={results['dataset']['transactions']}")
+    for row in results["results"]:
+        print(f"workers={row['workers']:3d}  build={row['build_seconds']:8.2f}s  speedup=x{row['speedup']:.2f}  "
+              f"efficiency={row['efficiency']:.2f}  content={row['build.content_seconds']:7.2f}s  "
+              f"collaborative={row['build.collaborative_seconds']:7.2f}s (x{row['collaborative_speedup']:.2f})  "
+              f"identical={row['identical_to_first']}")
+    if args.output:
+        Path(args.output).write_text(json.dumps({"args": vars(args), **results}, indent=2) + "\n", encoding="utf-8")
+    if not all(row["identical_to_first"] for row in results["results"]):
+        sys.exit("FAIL: item similarities differ across worker counts")
+
+
+if __name__ == "__main__":
+    main()
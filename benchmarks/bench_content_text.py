@@ -0,0 +1,112 @@
+# benchmarks/bench_content_text.py
+"""Compare ContentBasedModel text assembly and end-to-end fit time against the iterrows version.
+
+The legacy model is the pre-vectorization `fit`: an `iterrows` corpus fed to a
+fresh TfidfVectorizer. Both fits run on the same `synthetic_data` catalog and
+must produce the same vocabulary and TF-IDF matrix.
+
+Usage: python benchmarks/bench_content_text.py --products 200000 --repeat 3 [--chunk-size 50000] [--output text.json]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from synthetic_data import synthetic_products  # noqa: E402
+from models.content_based import ContentBasedModel  # noqa: E402
+
+TEXT_FIELDS = ["product_name", "category", "subcategory", "brand", "description"]
+
+
+class LegacyContentBasedModel:
+    """ContentBasedModel.fit as it was before the column-wise corpus."""
+    def __init__(self, text_fields, max_features=5000):
+        self.text_fields = text_fields
+        self.max_features = max_features
+        self.vectorizer = None
+        self.matrix = None
+
+    def _combine_text(self, products: pd.DataFrame) -> pd.Series:
+        texts = []
+        for _, row in products.iterrows():
+            parts = [str(row.get(col, "")) for col in self.text_fields]
+            texts.append(" ".join(parts))
+        return pd.Series(texts, index=products.index)
+
+    def fit(self, products: pd.DataFrame):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        combo = self._combine_text(products)
+        self.vectorizer = TfidfVectorizer(max_features=self.max_features, stop_words="english")
+        self.matrix = self.vectorizer.fit_transform(combo)
+        return self
+
+
+def timed(fn, repeat=1):
+    """Result of the last call and the fastest of `repeat` wall times."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def same_fit(a, b):
+    return (list(a.vectorizer.get_feature_names_out()) == list(b.vectorizer.get_feature_names_out())
+            and (a.matrix != b.matrix).nnz == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=None, help="Also time a fit streaming the corpus in chunks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per timing; the fastest is reported")
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the slow iterrows baseline")
+    parser.add_argument("--output", default=None, help="Write the JSON results here")
+    args = parser.parse_args()
+
+    products = synthetic_products(args.products, np.random.default_rng(args.seed))
+    from sklearn.feature_extraction.text import TfidfVectorizer  # noqa: F401  (import cost out of the timings)
+
+    results = {}
+    model = ContentBasedModel(TEXT_FIELDS)
+    new_text, results["combine_text_s"] = timed(lambda: model._combine_text(products), args.repeat)
+    _, results["fit_s"] = timed(lambda: model.fit(products), args.repeat)
+    if args.chunk_size:
+        chunked = ContentBasedModel(TEXT_FIELDS, chunk_size=args.chunk_size)
+        _, results["fit_chunked_s"] = timed(lambda: chunked.fit(products), args.repeat)
+        assert same_fit(model, chunked), "chunked fit differs from the in-memory fit"
+    if not args.skip_legacy:
+        legacy = LegacyContentBasedModel(TEXT_FIELDS)
+        old_text, results["legacy_combine_text_s"] = timed(lambda: legacy._combine_text(products), args.repeat)
+        assert old_text.tolist() == new_text.tolist(), "vectorized text differs from iterrows text"
+        _, results["legacy_fit_s"] = timed(lambda: legacy.fit(products), args.repeat)
+        assert same_fit(model, legacy), "fit differs from the legacy fit"
+
+    print(f"products: {args.products}")
+    print(f"combine_text   vectorized {results['combine_text_s']:8.3f}s", end="")
+    if "legacy_combine_text_s" in results:
+        print(f"   iterrows {results['legacy_combine_text_s']:8.3f}s   "
+              f"speedup x{results['legacy_combine_text_s'] / max(results['combine_text_s'], 1e-9):.1f}", end="")
+    print()
+    print(f"fit end-to-end current    {results['fit_s']:8.3f}s", end="")
+    if "legacy_fit_s" in results:
+        print(f"   legacy   {results['legacy_fit_s']:8.3f}s   "
+              f"speedup x{results['legacy_fit_s'] / max(results['fit_s'], 1e-9):.1f}", end="")
+    print()
+    if "fit_chunked_s" in results:
+        print(f"fit chunked ({args.chunk_size})  {results['fit_chunked_s']:8.3f}s")
+    if args.output:
+        Path(args.output).write_text(json.dumps({"args": vars(args), **results}, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
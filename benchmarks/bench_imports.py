@@ -0,0 +1,133 @@
+# benchmarks/bench_imports.py
+"""Interpreter startup and import cost of the CLI and the scoring path.
+
+Every scenario runs in a fresh interpreter --repeat times; the median wall time
+is reported next to the heavy modules it loaded. Exits 1 when `main.py --help`
+exceeds --budget-ms or a scenario imports a module it must not (no heavy
+dependency before argument parsing, no scikit-learn when scoring a persisted
+model).
+
+Usage: python benchmarks/bench_imports.py --repeat 7 --budget-ms 150 [--importtime] [--output imports.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ["numpy", "pandas", "scipy", "sklearn", "sqlalchemy", "yaml", "openpyxl", "pyarrow"]
+
+# Each child prints the heavy modules it ended up importing as its last line.
+_REPORT = f"import json, sys; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+
+_CLI_HELP = f"""
+import runpy, sys
+sys.argv = [{str(ROOT / 'main.py')!r}, "--help"]
+sys.stdout = open(__import__("os").devnull, "w")
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit:
+    pass
+sys.stdout = sys.__stdout__
+"""
+
+_SCORE = f"""
+import sys
+sys.path.insert(0, {str(ROOT)!r})
+from models.recommender import RecommenderSystem
+recsys = RecommenderSystem(config={{"artifacts": {{"dir": sys.argv[1]}}, "cache": {{"enabled": False}}}}).load_models()
+recsys.recommend_products(int(recsys.history_index.customer_ids[0]), top_n=10)
+"""
+
+SCENARIOS = {
+    # name: (code, modules that must stay unloaded)
+    "cli_help": (_CLI_HELP, HEAVY),
+    "import_recommender": (f"import sys; sys.path.insert(0, {str(ROOT)!r}); import models.recommender", ["sklearn"]),
+    "score_persisted": (_SCORE, ["sklearn"]),
+}
+
+
+def build_artifacts(workdir):
+    """Tiny synthetic dataset and model artifact, built in a child process."""
+    db_uri = f"sqlite:///{workdir / 'imports.db'}"
+    subprocess.run([sys.executable, str(Path(__file__).with_name("synthetic_data.py")), "--scale", "tiny",
+                    "--out-dir", str(workdir / "data"), "--db-uri", db_uri], check=True, stdout=subprocess.DEVNULL)
+    code = f"""
+import sys
+sys.path[:0] = [{str(Path(__file__).parent)!r}, {str(ROOT)!r}]
+from synthetic_data import get_engine
+from models.recommender import RecommenderSystem
+config = {{"artifacts": {{"dir": {str(workdir / 'artifacts')!r}}}}}
+RecommenderSystem(engine=get_engine({db_uri!r}), config=config).load_data().build_models().save_models()
+"""
+    subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+    return workdir / "artifacts"
+
+
+def run_once(code, args=(), importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code + "\n" + _REPORT, *args]
+    start = time.perf_counter()
+    out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(out.stdout.strip().splitlines()[-1]), out.stderr
+
+
+def top_imports(stderr, n=15):
+    """(cumulative_ms, module) of the slowest top-level imports in `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):  # nested imports are indented
+            rows.append((int(cumulative) / 1000.0, name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Median wall-time budget for main.py --help")
+    parser.add_argument("--artifacts", default=None, help="Artifact root to score from (default: build a tiny one)")
+    parser.add_argument("--importtime", action="store_true", help="Print the slowest imports of each scenario")
+    parser.add_argument("--output", default=None, help="Write the JSON results here")
+    args = parser.parse_args()
+
+    failures = []
+    results = {"python": sys.version.split()[0], "baseline_ms": None, "scenarios": {}}
+    with tempfile.TemporaryDirectory(prefix="recsys-imports-") as tmp:
+        artifact_root = args.artifacts or str(build_artifacts(Path(tmp)))
+        bare = [run_once("pass")[0] for _ in range(args.repeat)]
+        results["baseline_ms"] = round(1000.0 * statistics.median(bare), 1)
+        print(f"{'bare interpreter':22s} {results['baseline_ms']:8.1f} ms")
+        for name, (code, forbidden) in SCENARIOS.items():
+            extra = [artifact_root] if name == "score_persisted" else []
+            runs = [run_once(code, extra) for _ in range(args.repeat)]
+            median_ms = 1000.0 * statistics.median(r[0] for r in runs)
+            loaded = runs[-1][1]
+            bad = [m for m in forbidden if m in loaded]
+            results["scenarios"][name] = {"median_ms": round(median_ms, 1), "heavy_modules": loaded, "forbidden": bad}
+            print(f"{name:22s} {median_ms:8.1f} ms  loaded: {', '.join(loaded) or '-'}")
+            if bad:
+                failures.append(f"{name} imported {', '.join(bad)}")
+            if args.importtime:
+                for ms, module in top_imports(run_once(code, extra, importtime=True)[2]):
+                    print(f"    {ms:8.1f} ms  {module}")
+
+    cli_ms = results["scenarios"]["cli_help"]["median_ms"]
+    if cli_ms > args.budget_ms:
+        failures.append(f"main.py --help took {cli_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    results["failures"] = failures
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
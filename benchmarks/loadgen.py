@@ -0,0 +1,86 @@
+# benchmarks/loadgen.py
+"""Closed-loop load generator for `main.py serve`.
+
+Opens --concurrency keep-alive connections, each issuing GET /recommend/{id}
+back to back for --duration seconds, then reports QPS and latency percentiles.
+
+Usage: python benchmarks/loadgen.py --port 8000 --customers 1-5000 --concurrency 32 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+
+def parse_ids(spec):
+    if "-" in spec:
+        lo, hi = spec.split("-", 1)
+        return list(range(int(lo), int(hi) + 1))
+    return [int(x) for x in spec.split(",")]
+
+
+async def client(host, port, ids, top_n, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            cid = rng.choice(ids)
+            start = time.perf_counter()
+            writer.write(f"GET /recommend/{cid}?top_n={top_n} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    ids = parse_ids(args.customers)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[
+        client(args.host, args.port, ids, args.top_n, deadline, latencies, errors, seed=i)
+        for i in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    lat_ms = np.array(latencies) * 1000.0
+    report = {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "qps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(lat_ms, 50)) if len(lat_ms) else None,
+        "p99_ms": float(np.percentile(lat_ms, 99)) if len(lat_ms) else None,
+        "max_ms": float(lat_ms.max()) if len(lat_ms) else None,
+        "concurrency": args.concurrency,
+        "duration_s": elapsed,
+    }
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--customers", default="1-5", help="Id range 'a-b' or comma list")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
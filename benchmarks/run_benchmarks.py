@@ -0,0 +1,205 @@
+# benchmarks/run_benchmarks.py
+"""End-to-end benchmark: fit time per component, peak RSS, request latency and
+batch/export throughput, written as JSON tagged with the git commit.
+
+Without --db-uri a synthetic dataset of --scale is generated into a temporary
+SQLite database first. Pass --baseline with an earlier results file to print
+per-metric ratios (>1 means slower / bigger now).
+
+Usage: python benchmarks/run_benchmarks.py --scale small --neighbors-k 50 --output bench.json
+"""
+import argparse
+import contextlib
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from synthetic_data import SCALES, get_engine  # noqa: E402
+from models.recommender import RecommenderSystem  # noqa: E402
+from models.content_based import ContentBasedModel  # noqa: E402
+from models.als import ALSCollaborativeFiltering  # noqa: E402
+from models.collaborative_filtering import CollaborativeFiltering  # noqa: E402
+from models.hybrid_model import HybridRecommender  # noqa: E402
+from models import artifacts  # noqa: E402
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def git_commit():
+    def git(*args):
+        out = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() if out.returncode == 0 else None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+class Recorder:
+    def __init__(self):
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.stages[name] = {"seconds": round(time.perf_counter() - start, 4), "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+def latency_stats(seconds):
+    ms = np.asarray(seconds) * 1000.0
+    return {
+        "requests": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def run(args, db_uri, workdir):
+    config = {
+        "database": {"uri": db_uri},
+        "cache": {"enabled": False},
+        "recommender": {"top_n": args.top_n, "batch_size": args.batch_size, "neighbors_k": args.neighbors_k,
+                        "collaborative_backend": args.collaborative_backend},
+        "artifacts": {"dir": str(workdir / "artifacts")},
+    }
+    rec = Recorder()
+    recsys = RecommenderSystem(engine=get_engine(db_uri), config=config)
+
+    with rec.stage("load_data"):
+        recsys.load_data()
+    inter = recsys.interactions
+    with rec.stage("fit_content"):
+        content = ContentBasedModel(["product_name", "category", "subcategory", "brand", "description"])
+        content.fit(recsys.products_df, index=recsys.catalog.index)
+    with rec.stage("fit_collaborative"):
+        if args.collaborative_backend == "als":
+            collab = ALSCollaborativeFiltering()
+        else:
+            collab = CollaborativeFiltering(neighbors_k=args.neighbors_k, workers=args.build_workers)
+        collab.fit_arrays(inter.customer_ids, inter.product_ids, quantity=inter.quantity, rating=inter.rating)
+    with rec.stage("popularity"):
+        pop = inter.popularity()
+    with rec.stage("build_hybrid"):
+        hybrid = HybridRecommender(collab, content, pop, item_index=recsys.catalog.index)
+    recsys.content_model, recsys.collab_model, recsys.hybrid_model = content, collab, hybrid
+    recsys.model_version = artifacts.new_version(recsys.data_fingerprint or "")
+
+    with rec.stage("save_models"):
+        recsys.save_models()
+    with rec.stage("load_models"):
+        RecommenderSystem(engine=recsys.engine, config=config).load_models()
+
+    rng = np.random.default_rng(args.seed)
+    customers = np.unique(inter.customer_ids)
+    sample = rng.choice(customers, size=min(args.requests, len(customers)), replace=False).tolist()
+    recsys.recommend_products(sample[0])  # warm-up
+    timings = []
+    with rec.stage("single_requests"):
+        for cid in sample:
+            start = time.perf_counter()
+            recsys.recommend_products(cid)
+            timings.append(time.perf_counter() - start)
+
+    batch_ids = customers[:args.batch_customers].tolist()
+    with rec.stage("recommend_batch"):
+        recsys.recommend_batch(batch_ids)
+    with rec.stage("export_stream"):
+        recsys.export_stream(str(workdir / "recommendations.csv"), workers=args.workers)
+
+    n_customers = len(recsys.data.customers(columns=["customer_id"]))
+    return {
+        "meta": {
+            **git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "dataset": {
+            "customers": n_customers,
+            "products": len(recsys.catalog),
+            "transactions": len(inter),
+            "active_customers": len(customers),
+        },
+        "stages": rec.stages,
+        "latency": latency_stats(timings),
+        "throughput": {
+            "batch_customers_per_s": round(len(batch_ids) / rec.stages["recommend_batch"]["seconds"], 1),
+            "export_customers_per_s": round(n_customers / rec.stages["export_stream"]["seconds"], 1),
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(current, baseline):
+    """Print current / baseline ratios for every timing and memory figure."""
+    rows = [(f"stage.{name}.{key}", value, baseline["stages"].get(name, {}).get(key))
+            for name, stats in current["stages"].items() for key, value in stats.items()]
+    rows += [(f"latency.{key}", value, baseline["latency"].get(key))
+             for key, value in current["latency"].items() if key.endswith("_ms")]
+    # throughput is inverted so that >1 means worse everywhere
+    rows += [(f"throughput.{key} (inverse)", baseline["throughput"].get(key), value)
+             for key, value in current["throughput"].items()]
+    print(f"baseline commit {str(baseline['meta'].get('commit'))[:12]} -> {str(current['meta'].get('commit'))[:12]}")
+    for name, new, old in rows:
+        ratio = f"x{new / old:.2f}" if new and old else "n/a"
+        print(f"{name:45s} {ratio:>8s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommender end to end.")
+    parser.add_argument("--db-uri", default=None, help="Benchmark an existing database instead of generating one")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--neighbors-k", type=int, default=None, help="Keep top-K item neighbors (needed for large catalogs)")
+    parser.add_argument("--collaborative-backend", choices=["item_knn", "als"], default="item_knn")
+    parser.add_argument("--build-workers", type=int, default=1,
+                        help="Processes for the sharded item-item similarities (item_knn)")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--requests", type=int, default=500, help="Single-customer requests to time")
+    parser.add_argument("--batch-customers", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=1, help="Export worker processes")
+    parser.add_argument("--output", default=None, help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="recsys-bench-") as tmp:
+        workdir = Path(tmp)
+        db_uri = args.db_uri
+        if db_uri is None:
+            db_uri = f"sqlite:///{workdir / 'bench.db'}"
+            # generate in a child process so its memory does not count towards peak RSS
+            subprocess.run([
+                sys.executable, str(Path(__file__).with_name("synthetic_data.py")), "--scale", args.scale,
+                "--seed", str(args.seed), "--out-dir", str(workdir / "data"), "--db-uri", db_uri,
+            ], check=True, stdout=subprocess.DEVNULL)
+        results = run(args, db_uri, workdir)
+
+    payload = json.dumps(results, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    if args.baseline:
+        compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# benchmarks/synthetic_data.py
+"""Reproducible synthetic e-commerce data at realistic scale.
+
+Customer activity and product popularity both follow a Zipf (power-law)
+distribution; product text is assembled from category-specific vocabularies.
+Writes customers/products/transactions CSVs in the layout of data/*.csv and can
+load them into a database through database/insert_data.py.
+
+Usage: python benchmarks/synthetic_data.py --scale small --out-dir bench_data --db-uri sqlite:///bench_data/bench.db
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SCALES = {
+    # customers, products, transactions
+    "tiny": (1_000, 500, 10_000),
+    "small": (10_000, 2_000, 100_000),
+    "medium": (100_000, 20_000, 1_000_000),
+    "large": (1_000_000, 100_000, 10_000_000),
+}
+
+CATALOG = {
+    "Electronics": {
+        "Accessories": "wireless mouse keyboard stand cable charger hub ergonomic usb",
+        "Audio": "headphones earbuds speaker bluetooth noise cancelling bass",
+        "Power": "power bank fast charging battery portable adapter",
+    },
+    "Fashion": {
+        "Apparel": "cotton shirt jeans jacket hoodie slim fit casual",
+        "Footwear": "running shoes sneakers sandals leather lightweight sole",
+    },
+    "Home": {
+        "Kitchen": "coffee maker kettle steel bottle cookware nonstick blender",
+        "Decor": "lamp cushion frame candle rug minimalist wooden",
+    },
+    "Wearables": {
+        "Fitness": "smart band tracker heart rate sleep waterproof strap",
+    },
+}
+ADJECTIVES = "premium compact classic ultra durable smart eco deluxe pro lite everyday travel".split()
+SEGMENTS = ["Regular", "Prime", "Business"]
+CITIES = ["Chennai", "Bengaluru", "Mumbai", "Delhi", "Hyderabad", "Pune", "Kolkata", "Ahmedabad"]
+
+
+def zipf_weights(n, exponent, rng):
+    """Power-law probabilities over n ids, shuffled so rank is not id order."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _phrases(rng, vocab, n, k):
+    words = np.asarray(vocab)
+    picks = words[rng.integers(0, len(words), size=(n, k))]
+    return pd.Series(picks.tolist()).str.join(" ")
+
+
+def synthetic_customers(n, rng):
+    return pd.DataFrame({
+        "customer_id": np.arange(1, n + 1),
+        "customer_name": pd.Series(np.arange(1, n + 1)).map(lambda i: f"Customer {i}"),
+        "segment": np.asarray(SEGMENTS)[rng.integers(0, len(SEGMENTS), n)],
+        "location": np.asarray(CITIES)[rng.integers(0, len(CITIES), n)],
+    })
+
+
+def synthetic_products(n, rng, first_id=1, missing_description=0.02):
+    pairs = [(cat, sub) for cat, subs in CATALOG.items() for sub in subs]
+    pick = rng.integers(0, len(pairs), n)
+    category = np.array([pairs[i][0] for i in pick])
+    subcategory = np.array([pairs[i][1] for i in pick])
+    name = np.empty(n, dtype=object)
+    description = np.empty(n, dtype=object)
+    for j, (cat, sub) in enumerate(pairs):
+        rows = np.flatnonzero(pick == j)
+        vocab = CATALOG[cat][sub].split()
+        name[rows] = (_phrases(rng, ADJECTIVES, len(rows), 1) + " " + _phrases(rng, vocab, len(rows), 2)).to_numpy()
+        description[rows] = _phrases(rng, vocab + ADJECTIVES, len(rows), 8).to_numpy()
+    description[rng.random(n) < missing_description] = None
+    return pd.DataFrame({
+        "product_id": np.arange(first_id, first_id + n),
+        "product_name": name,
+        "category": category,
+        "subcategory": subcategory,
+        "brand": pd.Series(rng.integers(0, max(10, n // 50), n)).map(lambda b: f"Brand{b}").to_numpy(),
+        "price": rng.lognormal(7.0, 0.8, n).round(0),
+        "description": description,
+    })
+
+
+def synthetic_transactions(n, customer_ids, products, rng, user_exponent=1.0, item_exponent=1.1,
+                           start="2024-01-01", days=365, rating_fraction=0.1):
+    customers = rng.choice(customer_ids, size=n, p=zipf_weights(len(customer_ids), user_exponent, rng))
+    item_rows = rng.choice(len(products), size=n, p=zipf_weights(len(products), item_exponent, rng))
+    seconds = np.sort(rng.integers(0, days * 86400, n))
+    timestamps = pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")
+    rating = np.where(rng.random(n) < rating_fraction, rng.integers(1, 6, n).astype(float), np.nan)
+    return pd.DataFrame({
+        "transaction_id": np.arange(1, n + 1),
+        "customer_id": customers,
+        "product_id": products["product_id"].to_numpy()[item_rows],
+        "quantity": rng.choice([1, 1, 1, 2, 3], size=n),
+        "unit_price": products["price"].to_numpy()[item_rows],
+        "rating": rating,
+        "purchase_timestamp": timestamps.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def generate(n_customers, n_products, n_transactions, seed=42):
+    rng = np.random.default_rng(seed)
+    customers = synthetic_customers(n_customers, rng)
+    products = synthetic_products(n_products, rng)
+    transactions = synthetic_transactions(n_transactions, customers["customer_id"].to_numpy(), products, rng)
+    return customers, products, transactions
+
+
+def write_csvs(out_dir, customers, products, transactions):
+    os.makedirs(out_dir, exist_ok=True)
+    customers.to_csv(os.path.join(out_dir, "customers.csv"), index=False)
+    products.to_csv(os.path.join(out_dir, "products.csv"), index=False)
+    transactions.to_csv(os.path.join(out_dir, "transactions.csv"), index=False)
+
+
+def _database_path():
+    for sub in (("database", "database"), ("database", "database", "database")):
+        path = str(ROOT.joinpath(*sub))
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def get_engine(db_uri):
+    _database_path()
+    from db_utils import get_engine as _get_engine
+    return _get_engine(db_uri)
+
+
+def load_into_db(db_uri, data_dir, schema=ROOT / "database" / "schema.sql"):
+    """Create the schema and bulk-load the CSVs through insert_data."""
+    _database_path()
+    from insert_data import bulk_load, load_schema
+
+    engine = get_engine(db_uri)
+    load_schema(engine, str(schema))
+    bulk_load(engine, str(data_dir), str(schema))
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic e-commerce data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--customers", type=int, default=None, help="Override the scale's customer count")
+    parser.add_argument("--products", type=int, default=None, help="Override the scale's product count")
+    parser.add_argument("--transactions", type=int, default=None, help="Override the scale's transaction count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out-dir", default="bench_data", help="Directory for the CSV files")
+    parser.add_argument("--db-uri", default=None, help="Also load into this database (e.g. sqlite:///bench_data/bench.db)")
+    args = parser.parse_args()
+
+    n_c, n_p, n_t = SCALES[args.scale]
+    n_c, n_p, n_t = args.customers or n_c, args.products or n_p, args.transactions or n_t
+    customers, products, transactions = generate(n_c, n_p, n_t, seed=args.seed)
+    write_csvs(args.out_dir, customers, products, transactions)
+    print(f"Wrote {n_c} customers, {n_p} products, {n_t} transactions to {args.out_dir}")
+    if args.db_uri:
+        load_into_db(args.db_uri, args.out_dir)
+        print(f"Loaded into {args.db_uri}")
+
+
+if __name__ == "__main__":
+    main()
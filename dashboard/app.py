@@ -1,35 +1,109 @@
 # dashboard/app.py
+import tempfile
+import threading
 import streamlit as st
-import pandas as pd
 import yaml
 from pathlib import Path
 
-from models import RecommenderSystem
-from database.db_utils import get_engine
-from .charts import category_pie, top_products_bar
+from models import RecommenderSystem, artifacts
+from models.aggregates import AggregateStore
+from models.cache import RecommendationCache
+from database.db_utils import engine_from_config
+from .charts import category_counts, category_pie, top_products_chart
+from .session_state import get_state, set_state
 
 st.set_page_config(page_title="E-Commerce Recommender", layout="wide")
 
 
 CONFIG_PATH = Path("config.yaml") if Path("config.yaml").exists() else Path("config_example.yaml")
-with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-    config = yaml.safe_load(f)
 
 
-engine = get_engine(config["database"]["uri"])
-recommender = RecommenderSystem(engine=engine, config=config)
-recommender.load_data().build_models()
+# Models and frames are cached process-wide per model version, so a rerun after
+# a widget change only runs the per-customer history query and scoring.
+@st.cache_resource
+def load_config(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
 
-customers_df = recommender.data.customers()
-products_df = recommender.products_df
-transactions_df = recommender.transactions_df
+
+def latest_version(config):
+    """Name of the LATEST model artifact, or None before the first build."""
+    try:
+        return artifacts.resolve_version(config.get("artifacts", {}).get("dir", "artifacts")).name
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(max_entries=2, show_spinner="Loading models...")
+def get_recommender(config_path, version):
+    config = load_config(config_path)
+    engine = engine_from_config(config, read_only=True)
+    recommender = RecommenderSystem(engine=engine, config=config)
+    recommender.cache = RecommendationCache.from_config(config, enabled=True)  # interactive: cache by default
+    if version is None:
+        return recommender.load_or_build_models()
+    return recommender.load_models(version=version)
+
+
+@st.cache_resource
+def get_aggregates(config_path):
+    """Aggregate tables as last refreshed by build-models / update / refresh-aggregates."""
+    config = load_config(config_path)
+    return AggregateStore.from_config(engine_from_config(config, read_only=True), config)
+
+
+@st.cache_data(max_entries=2)
+def get_customers(_recommender, version):
+    return _recommender.data.customers(columns=["customer_id", "customer_name"])
+
+
+@st.cache_data(max_entries=2)
+def get_top_products(_aggregates, high_water_mark, top_n=10):
+    # keyed on the aggregates' high-water mark: a refresh invalidates it, a new model does not
+    return _aggregates.top_products(top_n)
+
+
+def start_export(config, artifact_path, filename, top_n):
+    """Export in a background thread into a fresh directory, so concurrent sessions never share a file."""
+    outpath = str(Path(tempfile.mkdtemp(prefix="recsys-export-")) / Path(filename).name)
+    job = {"done": 0, "total": 0, "outpath": outpath, "error": None, "finished": False}
+
+    def progress(done, total):
+        job["done"], job["total"] = done, total
+
+    def run():
+        try:
+            # a private instance: export_all loads transactions onto the recommender it runs on,
+            # and the cached one is shared by every session
+            recommender = RecommenderSystem(engine=engine_from_config(config, read_only=True), config=config)
+            recommender.load_models(root=artifact_path.parent, version=artifact_path.name)
+            recommender.export_all(outpath=outpath, top_n=top_n, progress=progress)
+        except Exception as exc:  # surfaced in the export panel
+            job["error"] = exc
+        job["finished"] = True
+
+    job["thread"] = threading.Thread(target=run, name="export-all", daemon=True)
+    job["thread"].start()
+    return job
+
+
+config = load_config(str(CONFIG_PATH))
+recommender = get_recommender(str(CONFIG_PATH), latest_version(config))
+version = recommender.model_version
+
+aggregates = get_aggregates(str(CONFIG_PATH))
+aggregates_mark = aggregates.high_water_mark()
+if aggregates_mark is None:
+    aggregates = None
+customers_df = get_customers(recommender, version)
+names = dict(zip(customers_df.customer_id, customers_df.customer_name))
 
 st.title("E-Commerce Recommendation System Dashboard")
 
 
 st.sidebar.header("Select Customer")
 selected_customer = st.sidebar.selectbox(
-    "Customer", options=customers_df.customer_id.tolist(), format_func=lambda cid: customers_df.loc[customers_df.customer_id==cid, "customer_name"].values[0]
+    "Customer", options=customers_df.customer_id.tolist(), format_func=names.get
 )
 
 st.sidebar.markdown("---")
@@ -54,7 +128,11 @@ st.markdown("---")
 c1, c2 = st.columns([1,1])
 with c1:
     st.subheader("Category Mix")
-    fig = category_pie(hist)
+    counts = aggregates.customer_categories(selected_customer) if aggregates is not None else None
+    if counts is None or counts.empty:
+        # no aggregates, or none for this customer since the last refresh: use the history loaded above
+        counts = category_counts(hist)
+    fig = category_pie(counts)
     if fig:
         st.plotly_chart(fig, use_container_width=True)
     else:
@@ -62,16 +140,41 @@ with c1:
 
 with c2:
     st.subheader("Top Products Overall")
-    fig2 = top_products_bar(transactions_df, products_df, top_n=10)
-    st.plotly_chart(fig2, use_container_width=True)
-
-
-if export_btn:
-    outpath = recommender.export_all(outpath=config["export"]["excel_filename"], top_n=config["recommender"]["top_n"])
-    st.success(f"Report exported: {outpath}")
-    st.download_button(
-        label="Download Excel",
-        data=open(outpath, "rb").read(),
-        file_name=outpath.split("/")[-1],
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    if aggregates is not None:
+        fig2 = top_products_chart(get_top_products(aggregates, aggregates_mark, top_n=10), top_n=10)
+        st.plotly_chart(fig2, use_container_width=True)
+    else:
+        st.info("No aggregates yet; run `main.py refresh-aggregates`.")
+
+
+job = get_state("export_job")
+if export_btn and (job is None or job["finished"]):
+    job = start_export(config, recommender.artifact_path, config["export"]["excel_filename"],
+                       config["recommender"]["top_n"])
+    set_state("export_job", job)
+
+
+@st.fragment(run_every=1.0)
+def export_progress(job):
+    # only this fragment reruns while the export thread works
+    if job["finished"]:
+        st.rerun()
+    total = job["total"] or 1
+    st.progress(job["done"] / total, text=f"Exporting... {job['done']}/{job['total']} customers")
+
+
+if job is not None:
+    with st.sidebar:
+        if not job["finished"]:
+            export_progress(job)
+        elif job["error"] is not None:
+            st.error(f"Export failed: {job['error']}")
+        else:
+            outpath = job["outpath"]
+            st.success(f"Report exported: {outpath}")
+            st.download_button(
+                label="Download Excel",
+                data=open(outpath, "rb").read(),
+                file_name=outpath.split("/")[-1],
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
@@ -3,19 +3,23 @@ import pandas as pd
 import plotly.express as px
 
 
-def category_pie(history_df: pd.DataFrame):
-    if history_df.empty:
-        return None
+def category_counts(history_df: pd.DataFrame) -> pd.DataFrame:
+    """category / count rows from a purchase history, for when no aggregate tables exist."""
     counts = history_df["category"].value_counts().reset_index()
-    counts.columns = ["category","count"]
+    counts.columns = ["category", "count"]
+    return counts
+
+
+def category_pie(counts: pd.DataFrame):
+    """Pie of category / count rows (customer_category_stats or `category_counts`)."""
+    if counts.empty:
+        return None
     fig = px.pie(counts, names="category", values="count", title="Purchase by Category")
     return fig
 
 
-def top_products_bar(transactions_df: pd.DataFrame, products_df: pd.DataFrame, top_n=10):
-    counts = transactions_df.groupby("product_id")["quantity"].sum().reset_index()
-    counts = counts.merge(products_df[["product_id","product_name"]], on="product_id", how="left")
-    counts = counts.sort_values("quantity", ascending=False).head(top_n)
+def top_products_chart(counts: pd.DataFrame, top_n=10):
+    """Bar chart of precomputed product_id / product_name / quantity rows."""
     fig = px.bar(counts, x="product_name", y="quantity", title=f"Top {top_n} Products", text="quantity")
     fig.update_layout(xaxis_tickangle=-45)
     return fig
@@ -1,16 +1,30 @@
 import argparse
+import csv
+import io
+import itertools
 import os
+import re
+import time
 import pandas as pd
 from sqlalchemy import text
 
 from db_utils import get_engine
 
+# load order respects the foreign keys
+TABLES = ["customers", "products", "transactions"]
+PROGRESS_TABLE = "_load_progress"
+COMPLETE_MARKER = "__complete__"  # progress row written once every table and index is loaded
+INDEX_PATTERN = re.compile(r"CREATE\s+INDEX\s+(idx_transactions_\w+)\s+ON\s+transactions\s*\(([^)]*)\)", re.IGNORECASE)
+
 
 def load_schema(engine, schema_path: str):
     with open(schema_path, "r", encoding="utf-8") as f:
         schema_sql = f.read()
+    # one statement per execute: sqlite3 refuses multi-statement strings
+    statements = [s.strip() for s in schema_sql.split(";") if s.strip()]
     with engine.begin() as conn:
-        conn.execute(text(schema_sql))
+        for statement in statements:
+            conn.execute(text(statement))
 
 
 def load_csvs(engine, data_dir: str):
@@ -23,17 +37,182 @@ def load_csvs(engine, data_dir: str):
     transactions.to_sql("transactions", engine, if_exists="append", index=False)
 
 
+# ---------- Bulk load ----------
+def transaction_indexes(schema_path: str):
+    """(name, columns) of the idx_transactions_* indexes declared in schema.sql."""
+    with open(schema_path, "r", encoding="utf-8") as f:
+        return INDEX_PATTERN.findall(f.read())
+
+
+def _sqlite_pragmas(conn, **pragmas):
+    """Set pragmas on `conn` and return their previous values."""
+    previous = {}
+    for name, value in pragmas.items():
+        previous[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        conn.exec_driver_sql(f"PRAGMA {name}={value}")
+    conn.commit()
+    return previous
+
+
+def _progress(conn, reset=False):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (table_name TEXT PRIMARY KEY, rows_loaded INTEGER NOT NULL)"
+    ))
+    if reset:
+        conn.execute(text(f"DELETE FROM {PROGRESS_TABLE}"))
+    done = dict(conn.execute(text(f"SELECT table_name, rows_loaded FROM {PROGRESS_TABLE}")).all())
+    conn.commit()
+    return done
+
+
+def _save_progress(conn, name, rows):
+    updated = conn.execute(text(f"UPDATE {PROGRESS_TABLE} SET rows_loaded = :n WHERE table_name = :t"),
+                           {"n": rows, "t": name})
+    if updated.rowcount == 0:
+        conn.execute(text(f"INSERT INTO {PROGRESS_TABLE} (table_name, rows_loaded) VALUES (:t, :n)"),
+                     {"t": name, "n": rows})
+
+
+def _has_rows(conn, name):
+    return conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is not None
+
+
+def _read_chunks(path, chunk_size, skip=0):
+    """CSV chunks after the first `skip` data rows.
+
+    The skipped lines are consumed from the file handle before pandas sees it;
+    `skiprows=range(...)` would make pandas materialize every skipped line
+    number first, which is hundreds of MiB when resuming tens of millions in.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        records = csv.reader(f)  # record-wise, so quoted newlines do not throw the count off
+        header = next(records)
+        for _ in itertools.islice(records, skip):
+            pass
+        yield from pd.read_csv(f, chunksize=chunk_size, header=None, names=header)
+
+
+def _copy_chunk(conn, name, chunk):
+    """Postgres COPY FROM STDIN of one chunk, on the connection's open transaction."""
+    buf = io.StringIO()
+    chunk.to_csv(buf, index=False, header=False, quoting=csv.QUOTE_MINIMAL)
+    buf.seek(0)
+    sql = f"COPY {name} ({', '.join(chunk.columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(sql, buf)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buf.getvalue())
+    finally:
+        cursor.close()
+
+
+def _placeholders(paramstyle, columns):
+    if paramstyle == "qmark":
+        return ["?"] * len(columns)
+    if paramstyle == "numeric":
+        return [f":{i}" for i in range(1, len(columns) + 1)]
+    if paramstyle == "named":
+        return [f":{c}" for c in columns]
+    return ["%s"] * len(columns)  # format / pyformat
+
+
+def _insert_chunk(conn, name, chunk):
+    """One DBAPI executemany of plain tuples; far cheaper than Core inserts of dicts."""
+    cols = list(chunk.columns)
+    marks = _placeholders(conn.dialect.paramstyle, cols)
+    sql = f"INSERT INTO {name} ({', '.join(cols)}) VALUES ({', '.join(marks)})"
+    values = chunk.astype(object).where(chunk.notna(), None)
+    if conn.dialect.paramstyle == "named":
+        rows = values.to_dict("records")
+    else:
+        rows = list(values.itertuples(index=False, name=None))
+    conn.exec_driver_sql(sql, rows)
+
+
+def bulk_load(engine, data_dir: str, schema_path: str, chunk_size: int = 100_000, resume: bool = False):
+    """Stream the CSVs into the database chunk by chunk.
+
+    Each chunk is inserted with one executemany (COPY on Postgres) and committed
+    together with its row count in `_load_progress`, so `resume=True` continues
+    an interrupted load right after the last committed chunk; resuming a load
+    that already completed is a no-op. The idx_transactions_* indexes are
+    dropped for the load and rebuilt at the end; on SQLite the connection runs
+    with WAL and synchronous=OFF meanwhile.
+    """
+    postgres = engine.dialect.name == "postgresql"
+    sqlite = engine.dialect.name == "sqlite"
+    indexes = transaction_indexes(schema_path)
+    total_rows, table_rows, total_start = 0, 0, time.perf_counter()
+    with engine.connect() as conn:
+        restore = _sqlite_pragmas(conn, journal_mode="WAL", synchronous="OFF") if sqlite else {}
+        try:
+            done = _progress(conn, reset=not resume)
+            if resume and COMPLETE_MARKER in done:
+                print(f"Already loaded: the previous bulk load completed ({done[COMPLETE_MARKER]} rows); "
+                      "nothing to resume.")
+                return 0
+            if resume and not done and _has_rows(conn, TABLES[0]):
+                raise SystemExit(f"{TABLES[0]} already has rows but there is no bulk load to resume; "
+                                 "run without --resume to reload from scratch.")
+            for idx, _ in indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {idx}"))
+            conn.commit()
+
+            for name in TABLES:
+                path = os.path.join(data_dir, f"{name}.csv")
+                skip = done.get(name, 0)
+                loaded, start = skip, time.perf_counter()
+                for chunk in _read_chunks(path, chunk_size, skip):
+                    if chunk.empty:  # table already complete on resume
+                        continue
+                    with conn.begin():
+                        (_copy_chunk if postgres else _insert_chunk)(conn, name, chunk)
+                        loaded += len(chunk)
+                        _save_progress(conn, name, loaded)
+                new_rows = loaded - skip
+                table_rows += loaded
+                elapsed = time.perf_counter() - start
+                total_rows += new_rows
+                resumed = f", resumed after {skip}" if skip else ""
+                print(f"{name}: {new_rows} rows in {elapsed:.1f}s ({new_rows / max(elapsed, 1e-9):,.0f} rows/s{resumed})")
+
+            start = time.perf_counter()
+            with conn.begin():
+                for idx, cols in indexes:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {idx} ON transactions({cols})"))
+            print(f"indexes: rebuilt {len(indexes)} in {time.perf_counter() - start:.1f}s")
+            with conn.begin():
+                _save_progress(conn, COMPLETE_MARKER, table_rows)
+        finally:
+            if restore:
+                _sqlite_pragmas(conn, **restore)
+    elapsed = time.perf_counter() - total_start
+    print(f"total: {total_rows} rows in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total_rows
+
+
 def main():
     parser = argparse.ArgumentParser(description="Load CSV data into DB.")
     parser.add_argument("--db-uri", default="sqlite:///database/ecommerce.db", help="SQLAlchemy DB URI")
     parser.add_argument("--data-dir", default="data", help="Directory containing CSV files")
     parser.add_argument("--schema", default="database/schema.sql", help="Path to schema SQL")
+    parser.add_argument("--bulk", action="store_true", help="Chunked bulk load (large datasets)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows per bulk insert")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted --bulk load")
     args = parser.parse_args()
 
     engine = get_engine(args.db_uri)
 
-    load_schema(engine, args.schema)
-    load_csvs(engine, args.data_dir)
+    if args.bulk:
+        if not args.resume:
+            load_schema(engine, args.schema)
+        bulk_load(engine, args.data_dir, args.schema, chunk_size=args.chunk_size, resume=args.resume)
+    else:
+        load_schema(engine, args.schema)
+        load_csvs(engine, args.data_dir)
     print("Data load complete.")
 
 
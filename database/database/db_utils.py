@@ -1,18 +1,206 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.engine import Engine
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
 
+# Applied on every new SQLite connection; values are passed to PRAGMA as-is.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # readers no longer block on a writer
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms to wait on a lock instead of failing with "database is locked"
+    "mmap_size": 268435456,
+    "cache_size": -65536,  # negative = KiB
+}
+# Pragmas that write to the database file; skipped on read-only connections.
+_WRITE_PRAGMAS = {"journal_mode", "synchronous"}
 
-def get_engine(db_uri: str = "sqlite:///database/ecommerce.db", echo: bool = False) -> Engine:
-    """Return a SQLAlchemy engine for the configured database URI.
+_engines = {}
+_lock = threading.Lock()
 
-    If SQLite, ensure directory exists.
+
+class PoolMetrics:
+    """Connection pool counters and checkout timings of one engine."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.hold_seconds = 0.0
+        self.max_hold_seconds = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self.timeouts += timed_out
+
+    def attach(self, engine):
+        @event.listens_for(engine, "connect")
+        def _connect(dbapi_conn, record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def _checkout(dbapi_conn, record, proxy):
+            record.info["checked_out_at"] = time.perf_counter()
+            with self._lock:
+                self.checkouts += 1
+                self.in_use += 1
+                self.max_in_use = max(self.max_in_use, self.in_use)
+
+        @event.listens_for(engine, "checkin")
+        def _checkin(dbapi_conn, record):
+            start = record.info.pop("checked_out_at", None)
+            if start is None:
+                return
+            held = time.perf_counter() - start
+            with self._lock:
+                self.in_use -= 1
+                self.hold_seconds += held
+                self.max_hold_seconds = max(self.max_hold_seconds, held)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = self.checkouts
+            return {
+                "connects": self.connects,
+                "checkouts": n,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "mean_wait_ms": 1000.0 * self.wait_seconds / n if n else 0.0,
+                "max_wait_ms": 1000.0 * self.max_wait_seconds,
+                "mean_hold_ms": 1000.0 * self.hold_seconds / n if n else 0.0,
+                "max_hold_ms": 1000.0 * self.max_hold_seconds,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a free connection."""
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _read_only_url(url):
+    # sqlite3 URI filename: file:<path>?mode=ro
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
+
+def _apply_sqlite_pragmas(engine, pragmas, read_only):
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, record):
+        cursor = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            if read_only and name in _WRITE_PRAGMAS:
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def get_engine(db_uri: str = "sqlite:///database/ecommerce.db", echo: bool = False, pool_size: int = 5,
+               max_overflow: int = 10, pool_timeout: float = 30.0, read_only: bool = False,
+               sqlite_pragmas: dict = None) -> Engine:
+    """Return the process-wide SQLAlchemy engine for the configured database URI.
+
+    Engines are cached per (URI, options), so every caller in a process shares
+    one connection pool. If SQLite, ensure directory exists, apply
+    SQLITE_PRAGMAS (overridable via `sqlite_pragmas`) and, with `read_only`,
+    open the file in read-only URI mode.
+    """
+    pragmas = {**SQLITE_PRAGMAS, **(sqlite_pragmas or {})}
+    key = (db_uri, echo, pool_size, max_overflow, pool_timeout, read_only, tuple(sorted(pragmas.items())))
+    with _lock:
+        if key in _engines:
+            return _engines[key][0]
+
+        url = make_url(db_uri)
+        sqlite = url.get_backend_name() == "sqlite"
+        in_memory = sqlite and url.database in (None, "", ":memory:")
+        kwargs = {}
+        if not in_memory:
+            kwargs.update(poolclass=TimedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                          pool_timeout=pool_timeout)
+        if sqlite and not in_memory:
+            dirpath = os.path.dirname(url.database)
+            if dirpath and not read_only:
+                os.makedirs(dirpath, exist_ok=True)
+            if read_only:
+                url = _read_only_url(url)
+        engine = create_engine(url, echo=echo, future=True, **kwargs)
+
+        metrics = PoolMetrics()
+        metrics.attach(engine)
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.metrics = metrics
+        if sqlite:
+            _apply_sqlite_pragmas(engine, pragmas, read_only)
+        _engines[key] = (engine, metrics)
+        return engine
+
+
+def engine_from_config(config: dict, read_only: bool = None) -> Engine:
+    """Engine for the `database` config section.
+
+    Keys: uri, pool_size, max_overflow, pool_timeout, read_only, sqlite (pragma
+    overrides). `read_only` overrides the config value, e.g. for serving processes.
     """
-    if db_uri.startswith("sqlite"):
-        # sqlite:///path/to/db.sqlite
-        path = db_uri.split("///")[-1]
-        dirpath = os.path.dirname(path)
-        if dirpath:
-            os.makedirs(dirpath, exist_ok=True)
-    engine = create_engine(db_uri, echo=echo, future=True)
-    return engine
+    db = (config or {}).get("database", {})
+    return get_engine(
+        db["uri"],
+        echo=db.get("echo", False),
+        pool_size=db.get("pool_size", 5),
+        max_overflow=db.get("max_overflow", 10),
+        pool_timeout=db.get("pool_timeout", 30.0),
+        read_only=db.get("read_only", False) if read_only is None else read_only,
+        sqlite_pragmas=db.get("sqlite"),
+    )
+
+
+def pool_metrics() -> dict:
+    """Pool counters and checkout timings of every engine in this process, by URI."""
+    with _lock:
+        entries = list(_engines.values())
+    return {
+        engine.url.render_as_string(hide_password=True): {**metrics.snapshot(), "pool": engine.pool.status()}
+        for engine, metrics in entries
+    }
+
+
+def dispose_engines():
+    with _lock:
+        entries = list(_engines.values())
+        _engines.clear()
+    for engine, _ in entries:
+        engine.dispose()
+
+
+def _after_fork():
+    # pooled connections must not be shared with a forked child
+    for engine, _ in list(_engines.values()):
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -1,4 +1,9 @@
 
+-- created with its triggers by models/data_loader.py (DataLoader.data_version) on first use
+DROP TABLE IF EXISTS data_version;
+DROP TABLE IF EXISTS aggregate_state;
+DROP TABLE IF EXISTS customer_category_stats;
+DROP TABLE IF EXISTS product_stats;
 DROP TABLE IF EXISTS transactions;
 DROP TABLE IF EXISTS customers;
 DROP TABLE IF EXISTS products;
@@ -35,3 +40,27 @@ CREATE TABLE transactions (
 CREATE INDEX idx_transactions_customer ON transactions(customer_id);
 CREATE INDEX idx_transactions_product ON transactions(product_id);
 CREATE INDEX idx_transactions_timestamp ON transactions(purchase_timestamp);
+
+-- Aggregates maintained incrementally by models/aggregates.py (AggregateStore.refresh)
+CREATE TABLE product_stats (
+    product_id INTEGER PRIMARY KEY,
+    total_quantity REAL NOT NULL DEFAULT 0,
+    purchase_count INTEGER NOT NULL DEFAULT 0,
+    decayed_quantity REAL NOT NULL DEFAULT 0,
+    last_purchase TEXT
+);
+
+CREATE TABLE customer_category_stats (
+    customer_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    purchase_count INTEGER NOT NULL DEFAULT 0,
+    total_quantity REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (customer_id, category)
+);
+
+CREATE TABLE aggregate_state (
+    id INTEGER PRIMARY KEY,
+    last_transaction_id INTEGER NOT NULL,
+    decay_reference TEXT,
+    half_life_days REAL
+);
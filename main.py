@@ -1,12 +1,13 @@
 import argparse
-import yaml
 from pathlib import Path
 
-from database.db_utils import get_engine
-from models import RecommenderSystem
+# Heavy dependencies (pandas, scipy, scikit-learn, SQLAlchemy, yaml) are imported
+# inside the commands that need them, so argument parsing and --help stay cheap.
 
 
 def load_config(config_path):
+    import yaml
+
     path = Path(config_path)
     if not path.exists():
         raise FileNotFoundError(f"Config file {config_path} not found.")
@@ -14,60 +15,223 @@ def load_config(config_path):
         return yaml.safe_load(f)
 
 
+def make_recommender(config, read_only=None):
+    """RecommenderSystem on the configured database engine."""
+    from database.db_utils import engine_from_config
+    from models import RecommenderSystem
+
+    return RecommenderSystem(engine=engine_from_config(config, read_only=read_only), config=config)
+
+
 def cmd_build_models(config_path):
     config = load_config(config_path)
-    engine = get_engine(config["database"]["uri"])
-    recsys = RecommenderSystem(engine=engine, config=config)
-    recsys.load_data().build_models()
-    print("Models built successfully.")
+    recsys = make_recommender(config)
+    recsys.load_data(refresh_aggregates=True).build_models()
+    path = recsys.save_models()
+    print(f"Models built successfully. Artifacts written to {path}")
+
+
+def cmd_update(config_path):
+    config = load_config(config_path)
+    recsys = make_recommender(config)
+    recsys.load_models()
+    before = recsys.model_version
+    recsys.update()
+    if recsys.model_version == before:
+        print(f"No transactions after transaction_id {recsys.last_transaction_id}; models unchanged.")
+        return
+    path = recsys.save_models()
+    print(f"Models updated through transaction_id {recsys.last_transaction_id} ({recsys.watermark}). "
+          f"Artifacts written to {path}")
+
+
+def cmd_refresh_aggregates(config_path, rebuild=False):
+    from database.db_utils import engine_from_config
+    from models.aggregates import AggregateStore
+
+    config = load_config(config_path)
+    store = AggregateStore.from_config(engine_from_config(config), config)
+    rows = store.rebuild() if rebuild else store.refresh()
+    print(f"Aggregates {'rebuilt' if rebuild else 'refreshed'}: {rows} transactions folded.")
+
+
+def cmd_serve(config_path, host, port, workers, watch):
+    from api.server import serve
+
+    config = load_config(config_path)
+    server_cfg = config.get("server", {})
+    # the workers load the model; the parent only needs where it is
+    artifact_path = make_recommender(config, read_only=True).ensure_artifact()
+    serve(
+        config,
+        artifact_path.parent,
+        host=host or server_cfg.get("host", "127.0.0.1"),
+        port=port or server_cfg.get("port", 8000),
+        workers=workers or server_cfg.get("workers", 2),
+        watch_interval=watch if watch is not None else server_cfg.get("watch_interval"),
+    )
+
+
+def parse_weight_grid(spec):
+    """'0.6,0.3,0.1 0.5,0.4,0.1' -> list of {collaborative, content, popularity} dicts."""
+    grid = []
+    for item in spec.split():
+        c, t, p = (float(x) for x in item.split(","))
+        grid.append({"collaborative": c, "content": t, "popularity": p})
+    return grid
+
+
+def cmd_evaluate(config_path, k, test_fraction, grid_spec, workers, output):
+    import json
+    from models.evaluation import evaluate
+
+    config = load_config(config_path)
+    eval_cfg = config.get("evaluation", {})
+    recsys = make_recommender(config)
+    grid = parse_weight_grid(grid_spec) if grid_spec else eval_cfg.get("weight_grid")
+    report = evaluate(
+        recsys,
+        recsys.data.products(),
+        recsys.data.transactions(),
+        weight_grid=grid,
+        k=k,
+        test_fraction=test_fraction if test_fraction is not None else eval_cfg.get("test_fraction", 0.2),
+        workers=workers or eval_cfg.get("workers", 1),
+    )
+    print(f"Cutoff {report['cutoff']}: {report['train_transactions']} train / {report['test_transactions']} test transactions")
+    for res in report["results"]:
+        w = res["weights"]
+        metrics = "  ".join(f"{name}={value:.4f}" for name, value in res.items() if "@" in name)
+        print(f"w=({w['collaborative']:.2f},{w['content']:.2f},{w['popularity']:.2f}) users={res['users']}  {metrics}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output}")
 
 
 def cmd_recommend(config_path, customer_id, top_n):
     config = load_config(config_path)
-    engine = get_engine(config["database"]["uri"])
-    recsys = RecommenderSystem(engine=engine, config=config)
-    recsys.load_data().build_models()
+    recsys = make_recommender(config)
+    recsys.load_or_build_models()
     df = recsys.recommend_products(customer_id, top_n=top_n)
     print(df.to_string(index=False))
 
 
-def cmd_export(config_path, outpath, top_n):
+def cmd_export(config_path, outpath, top_n, stream=False, fmt=None, workers=None):
     config = load_config(config_path)
-    engine = get_engine(config["database"]["uri"])
-    recsys = RecommenderSystem(engine=engine, config=config)
-    recsys.load_data().build_models()
-    recsys.export_all(outpath=outpath, top_n=top_n)
+    recsys = make_recommender(config)
+    recsys.load_or_build_models()
+    if stream:
+        recsys.export_stream(outpath, top_n=top_n, fmt=fmt, workers=workers)
+    else:
+        recsys.export_all(outpath=outpath, top_n=top_n)
     print(f"Report exported to {outpath}")
 
 
+def write_metrics(path):
+    import json
+    from models.instrumentation import metrics
+
+    summary = json.dumps(metrics.summary(), indent=2)
+    if path == "-":
+        print(summary)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(summary + "\n")
+    print(f"Metrics written to {path}")
+
+
+def run_command(args):
+    if args.command == "build-models":
+        cmd_build_models(args.config)
+    elif args.command == "update":
+        cmd_update(args.config)
+    elif args.command == "refresh-aggregates":
+        cmd_refresh_aggregates(args.config, args.rebuild)
+    elif args.command == "recommend":
+        cmd_recommend(args.config, args.customer_id, args.top_n)
+    elif args.command == "export":
+        cmd_export(args.config, args.outpath, args.top_n, args.stream, args.format, args.workers)
+    elif args.command == "evaluate":
+        cmd_evaluate(args.config, args.k, args.test_fraction, args.grid, args.workers, args.output)
+    elif args.command == "serve":
+        cmd_serve(args.config, args.host, args.port, args.workers, args.watch)
+
+
 def main():
     parser = argparse.ArgumentParser(description="E-commerce Recommendation System CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
+    # options shared by every command
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--profile", default=None, metavar="PATH",
+                        help="Write cProfile stats of this run to PATH (pstats/snakeviz/flameprof input)")
+    common.add_argument("--metrics", default=None, metavar="PATH",
+                        help="Write a JSON summary of stage timings and counters to PATH ('-' for stdout)")
+
     # build-models command
-    p_build = subparsers.add_parser("build-models", help="Build recommendation models")
+    p_build = subparsers.add_parser("build-models", parents=[common], help="Build recommendation models and write model artifacts")
     p_build.add_argument("--config", default="config_example.yaml", help="Path to config YAML")
 
+    # update command
+    p_update = subparsers.add_parser("update", parents=[common], help="Fold new transactions into the latest model artifacts")
+    p_update.add_argument("--config", default="config_example.yaml", help="Path to config YAML")
+
+    # refresh-aggregates command
+    p_agg = subparsers.add_parser("refresh-aggregates", parents=[common], help="Fold new transactions into the aggregate tables")
+    p_agg.add_argument("--config", default="config_example.yaml", help="Path to config YAML")
+    p_agg.add_argument("--rebuild", action="store_true", help="Recompute the aggregates from every transaction")
+
     # recommend command
-    p_recommend = subparsers.add_parser("recommend", help="Recommend products for a customer")
+    p_recommend = subparsers.add_parser("recommend", parents=[common], help="Recommend products for a customer")
     p_recommend.add_argument("customer_id", type=int, help="Customer ID")
     p_recommend.add_argument("--config", default="config_example.yaml", help="Path to config YAML")
     p_recommend.add_argument("--top-n", type=int, default=10, help="Number of recommendations")
 
     # export command
-    p_export = subparsers.add_parser("export", help="Export Excel reports for all customers")
+    p_export = subparsers.add_parser("export", parents=[common], help="Export Excel reports for all customers")
     p_export.add_argument("--config", default="config_example.yaml", help="Path to config YAML")
     p_export.add_argument("--outpath", default="data/sample_reports.xlsx", help="Output Excel file path")
     p_export.add_argument("--top-n", type=int, default=10, help="Number of recommendations per customer")
+    p_export.add_argument("--stream", action="store_true", help="Write one long recommendations table incrementally")
+    p_export.add_argument("--format", choices=["xlsx", "csv", "parquet"], default=None,
+                          help="Streaming output format (default: from --outpath suffix)")
+    p_export.add_argument("--workers", type=int, default=None, help="Scoring processes for --stream")
+
+    # evaluate command
+    p_eval = subparsers.add_parser("evaluate", parents=[common], help="Time-split offline evaluation and hybrid weight sweep")
+    p_eval.add_argument("--config", default="config_example.yaml", help="Path to config YAML")
+    p_eval.add_argument("--k", type=int, default=10, help="Cutoff rank for the metrics")
+    p_eval.add_argument("--test-fraction", type=float, default=None, help="Latest fraction of transactions held out")
+    p_eval.add_argument("--grid", default=None,
+                        help="Space-separated collaborative,content,popularity weight triples to sweep")
+    p_eval.add_argument("--workers", type=int, default=None, help="Parallel grid evaluations")
+    p_eval.add_argument("--output", default=None, help="Write the JSON report to this path")
+
+    # serve command
+    p_serve = subparsers.add_parser("serve", parents=[common], help="Run the recommendation HTTP service")
+    p_serve.add_argument("--config", default="config_example.yaml", help="Path to config YAML")
+    p_serve.add_argument("--host", default=None, help="Bind address (default 127.0.0.1)")
+    p_serve.add_argument("--port", type=int, default=None, help="Port (default 8000)")
+    p_serve.add_argument("--workers", type=int, default=None, help="Scoring processes (default 2)")
+    p_serve.add_argument("--watch", type=float, default=None, help="Seconds between checks for a newer model")
 
     args = parser.parse_args()
-
-    if args.command == "build-models":
-        cmd_build_models(args.config)
-    elif args.command == "recommend":
-        cmd_recommend(args.config, args.customer_id, args.top_n)
-    elif args.command == "export":
-        cmd_export(args.config, args.outpath, args.top_n)
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        run_command(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to {args.profile}")
+        if args.metrics:
+            write_metrics(args.metrics)
 
 
 if __name__ == "__main__":
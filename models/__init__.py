@@ -0,0 +1,23 @@
+# models/__init__.py
+# Exports are resolved on first access, so importing a light submodule
+# (e.g. models.cache) does not pull in the whole model stack.
+import importlib
+
+_EXPORTS = {
+    "RecommenderSystem": ".recommender",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
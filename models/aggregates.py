@@ -0,0 +1,268 @@
+# models/aggregates.py
+import contextlib
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+# Same definitions as database/schema.sql; created on demand for older databases.
+AGGREGATE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS product_stats (
+        product_id INTEGER PRIMARY KEY,
+        total_quantity REAL NOT NULL DEFAULT 0,
+        purchase_count INTEGER NOT NULL DEFAULT 0,
+        decayed_quantity REAL NOT NULL DEFAULT 0,
+        last_purchase TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS customer_category_stats (
+        customer_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        purchase_count INTEGER NOT NULL DEFAULT 0,
+        total_quantity REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (customer_id, category)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS aggregate_state (
+        id INTEGER PRIMARY KEY,
+        last_transaction_id INTEGER NOT NULL,
+        decay_reference TEXT,
+        half_life_days REAL
+    )
+    """,
+]
+AGGREGATE_TABLES = ["product_stats", "customer_category_stats", "aggregate_state"]
+# pg_advisory_xact_lock key serializing writers of the aggregate tables
+_ADVISORY_LOCK_KEY = 0x72656373  # "recs"
+
+_UPSERT_PRODUCT = text("""
+    INSERT INTO product_stats (product_id, total_quantity, purchase_count, decayed_quantity, last_purchase)
+    VALUES (:product_id, :total_quantity, :purchase_count, :decayed_quantity, :last_purchase)
+    ON CONFLICT (product_id) DO UPDATE SET
+        total_quantity = product_stats.total_quantity + excluded.total_quantity,
+        purchase_count = product_stats.purchase_count + excluded.purchase_count,
+        decayed_quantity = product_stats.decayed_quantity + excluded.decayed_quantity,
+        last_purchase = CASE
+            WHEN product_stats.last_purchase IS NULL OR excluded.last_purchase > product_stats.last_purchase
+            THEN excluded.last_purchase ELSE product_stats.last_purchase END
+""")
+_UPSERT_CATEGORY = text("""
+    INSERT INTO customer_category_stats (customer_id, category, purchase_count, total_quantity)
+    VALUES (:customer_id, :category, :purchase_count, :total_quantity)
+    ON CONFLICT (customer_id, category) DO UPDATE SET
+        purchase_count = customer_category_stats.purchase_count + excluded.purchase_count,
+        total_quantity = customer_category_stats.total_quantity + excluded.total_quantity
+""")
+_UPSERT_STATE = text("""
+    INSERT INTO aggregate_state (id, last_transaction_id, decay_reference, half_life_days)
+    VALUES (1, :last_transaction_id, :decay_reference, :half_life_days)
+    ON CONFLICT (id) DO UPDATE SET
+        last_transaction_id = excluded.last_transaction_id,
+        decay_reference = excluded.decay_reference,
+        half_life_days = excluded.half_life_days
+""")
+
+
+def _records(df: pd.DataFrame):
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _advance(reference, timestamps):
+    """Decay reference after folding `timestamps`: the latest purchase seen."""
+    latest = timestamps.max()
+    return latest if reference is None or (pd.notna(latest) and latest > reference) else reference
+
+
+def _decay(quantity, timestamps, reference, new_reference, half_life_days):
+    """(factor moving values decayed to `reference` onto `new_reference`, `quantity` decayed to `new_reference`)."""
+    factor = 1.0
+    if reference is not None and new_reference > reference:
+        factor = 0.5 ** ((new_reference - reference) / pd.Timedelta(days=half_life_days))
+    age_days = ((new_reference - timestamps) / pd.Timedelta(days=1)).fillna(0.0).clip(lower=0.0)
+    return factor, quantity * np.power(0.5, age_days / half_life_days)
+
+
+def fold_popularity(popularity: pd.Series, rows: pd.DataFrame, reference=None, half_life_days=None) -> pd.Series:
+    """`popularity` with `rows` added the way `AggregateStore.refresh` folds them.
+
+    With a half-life, `popularity` is taken as decayed to `reference` (the
+    latest purchase it includes): it is scaled to the newest purchase in `rows`
+    and the rows are decayed to that same point, as `decayed_quantity` would be.
+    Without one, quantities are summed as `total_quantity` is.
+    """
+    qty = rows["quantity"].astype(float).fillna(0.0)
+    if half_life_days:
+        ts = pd.to_datetime(rows["purchase_timestamp"])
+        factor, qty = _decay(qty, ts, reference, _advance(reference, ts), half_life_days)
+        popularity = popularity * factor
+    added = qty.groupby(rows["product_id"].to_numpy()).sum()
+    return popularity.add(added, fill_value=0).rename_axis("product_id").sort_values(ascending=False)
+
+
+class AggregateStore:
+    """Per-product and per-customer-per-category purchase aggregates kept in the database.
+
+    `refresh` folds transactions with a transaction_id above the stored
+    high-water mark into the tables, so only new rows are ever scanned. With a
+    half-life, `decayed_quantity` holds sum(quantity * 0.5 ** (age / half_life))
+    relative to `decay_reference`, the latest purchase seen: each refresh scales
+    the stored values by the elapsed decay and adds the new rows.
+    """
+    def __init__(self, engine, half_life_days=None, chunk_size=200_000):
+        self.engine = engine
+        self.half_life_days = half_life_days
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_config(cls, engine, config):
+        cfg = (config or {}).get("popularity", {})
+        return cls(engine, half_life_days=cfg.get("half_life_days"), chunk_size=cfg.get("refresh_chunk_size", 200_000))
+
+    @property
+    def read_only(self):
+        return self.engine.url.query.get("mode") == "ro"
+
+    def exists(self):
+        """True once the tables exist and have been refreshed at least once."""
+        return self.high_water_mark() is not None
+
+    def high_water_mark(self):
+        """last_transaction_id folded into the tables, or None before the first refresh."""
+        names = set(inspect(self.engine).get_table_names())
+        if not all(t in names for t in AGGREGATE_TABLES):
+            return None
+        with self.engine.connect() as conn:
+            state = self._state(conn)
+        return None if state is None else state[0]
+
+    def _state(self, conn, for_update=False):
+        """(last_transaction_id, decay_reference, half_life_days), or None before the first refresh."""
+        row = conn.execute(text(
+            "SELECT last_transaction_id, decay_reference, half_life_days FROM aggregate_state WHERE id = 1"
+            + (" FOR UPDATE" if for_update else "")
+        )).one_or_none()
+        if row is None:
+            return None
+        return row[0], pd.Timestamp(row[1]) if row[1] else None, row[2]
+
+    @contextlib.contextmanager
+    def _write_transaction(self):
+        """Transaction holding the aggregates write lock, yielding (conn, state).
+
+        Writers serialize on it, so concurrent refreshers never fold the same
+        transaction_id range twice: SQLite takes the database write lock up front
+        (BEGIN IMMEDIATE, instead of failing to upgrade a read transaction),
+        PostgreSQL a transaction-scoped advisory lock, other databases lock the
+        state row. The tables are created first if missing.
+        """
+        with self.engine.begin() as conn:
+            dialect = self.engine.dialect.name
+            if dialect == "sqlite":
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            elif dialect == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+            for ddl in AGGREGATE_DDL:
+                conn.execute(text(ddl))
+            yield conn, self._state(conn, for_update=dialect not in ("sqlite", "postgresql"))
+
+    def rebuild(self):
+        """Drop the aggregate rows and recompute them from every transaction."""
+        with self._write_transaction() as (conn, _):
+            for name in AGGREGATE_TABLES:
+                conn.execute(text(f"DELETE FROM {name}"))
+            # claim the tables for this half-life before any row is folded
+            conn.execute(_UPSERT_STATE, {"last_transaction_id": 0, "decay_reference": None,
+                                         "half_life_days": self.half_life_days})
+        return self.refresh()
+
+    def refresh(self):
+        """Fold transactions newer than the stored high-water mark; returns rows folded.
+
+        Raises ValueError when the tables were built with another half-life: the
+        decayed values would be wrong, and recomputing them is left to an explicit
+        `rebuild` (`main.py refresh-aggregates --rebuild`).
+        """
+        folded = 0
+        while True:
+            with self._write_transaction() as (conn, state):
+                if state is not None and state[2] != self.half_life_days:
+                    raise ValueError(
+                        f"Aggregate tables were built with half_life_days={state[2]!r}, not {self.half_life_days!r}; "
+                        "run `main.py refresh-aggregates --rebuild` to recompute them."
+                    )
+                last_id, reference, _ = state or (0, None, None)
+                chunk = pd.read_sql(text("""
+                    SELECT t.transaction_id, t.customer_id, t.product_id, t.quantity, t.purchase_timestamp, p.category
+                    FROM transactions t LEFT JOIN products p ON t.product_id = p.product_id
+                    WHERE t.transaction_id > :last
+                    ORDER BY t.transaction_id
+                    LIMIT :n
+                """), conn, params={"last": last_id, "n": self.chunk_size}, parse_dates=["purchase_timestamp"])
+                if chunk.empty:
+                    return folded
+                self._fold(conn, chunk, reference)
+                folded += len(chunk)
+
+    def _fold(self, conn, chunk, reference):
+        qty = chunk["quantity"].astype(float).fillna(0.0)
+        ts = chunk["purchase_timestamp"]
+        new_reference = _advance(reference, ts)
+        if self.half_life_days:
+            factor, decayed = _decay(qty, ts, reference, new_reference, self.half_life_days)
+            if factor != 1.0:
+                conn.execute(text("UPDATE product_stats SET decayed_quantity = decayed_quantity * :f"), {"f": factor})
+        else:
+            decayed = pd.Series(0.0, index=chunk.index)
+
+        products = pd.DataFrame({"product_id": chunk["product_id"], "q": qty, "d": decayed, "ts": ts}).groupby("product_id").agg(
+            total_quantity=("q", "sum"), purchase_count=("q", "size"), decayed_quantity=("d", "sum"), last_purchase=("ts", "max"),
+        ).reset_index()
+        products["last_purchase"] = products["last_purchase"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        conn.execute(_UPSERT_PRODUCT, _records(products))
+
+        known = chunk["category"].notna()
+        categories = pd.DataFrame({
+            "customer_id": chunk["customer_id"][known], "category": chunk["category"][known], "q": qty[known],
+        }).groupby(["customer_id", "category"]).agg(
+            purchase_count=("q", "size"), total_quantity=("q", "sum"),
+        ).reset_index()
+        if not categories.empty:
+            conn.execute(_UPSERT_CATEGORY, _records(categories))
+
+        conn.execute(_UPSERT_STATE, {
+            "last_transaction_id": int(chunk["transaction_id"].max()),
+            "decay_reference": None if pd.isna(new_reference) else str(new_reference),
+            "half_life_days": self.half_life_days,
+        })
+
+    # ---------- Reads ----------
+    def popularity(self, decayed=None) -> pd.Series:
+        """Quantity per product_id (time-decayed when a half-life is set), most popular first."""
+        decayed = bool(self.half_life_days) if decayed is None else decayed
+        column = "decayed_quantity" if decayed else "total_quantity"
+        df = pd.read_sql(f"SELECT product_id, {column} AS quantity FROM product_stats ORDER BY {column} DESC, product_id",
+                         self.engine)
+        return pd.Series(df["quantity"].to_numpy(dtype=float), index=pd.Index(df["product_id"], name="product_id"),
+                         name="quantity")
+
+    def top_products(self, top_n=10) -> pd.DataFrame:
+        """product_id, product_name, quantity and purchase_count of the best sellers."""
+        q = text("""
+            SELECT s.product_id, p.product_name, s.total_quantity AS quantity, s.purchase_count
+            FROM product_stats s LEFT JOIN products p ON s.product_id = p.product_id
+            ORDER BY s.total_quantity DESC, s.product_id
+            LIMIT :n
+        """)
+        return pd.read_sql(q, self.engine, params={"n": top_n})
+
+    def customer_categories(self, customer_id: int) -> pd.DataFrame:
+        """category / count (purchases) / quantity rows of one customer."""
+        q = text("""
+            SELECT category, purchase_count AS count, total_quantity AS quantity
+            FROM customer_category_stats WHERE customer_id = :cid
+            ORDER BY purchase_count DESC, category
+        """)
+        return pd.read_sql(q, self.engine, params={"cid": customer_id})
@@ -0,0 +1,174 @@
+# models/als.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from .collaborative_filtering import CollaborativeFiltering
+
+
+def _conjugate_gradient(interactions, rows, x, factors, gram, alpha, steps):
+    """A few batched CG steps on the implicit-ALS normal equations of `rows`.
+
+    For each row u this approximately solves
+    (F'F + F'(C_u - I)F + reg*I) x_u = F'C_u p_u, warm-started from `x[rows]`,
+    where C_u = 1 + alpha * r_u and p_u is 1 on the row's stored entries. The
+    F'F + reg*I part is the shared `gram`; the per-row correction only touches
+    the row's nonzeros, so a block of rows costs O(nnz * k) instead of O(items * k).
+    """
+    sub = interactions[rows]
+    conf = (1.0 + alpha * sub.data).astype(np.float32)
+    owner = np.repeat(np.arange(len(rows)), np.diff(sub.indptr))
+    gathered = factors[sub.indices]  # nnz x k
+
+    def apply(v):
+        dots = np.einsum("ij,ij->i", gathered, v[owner])
+        weights = csr_matrix(((conf - 1.0) * dots, sub.indices, sub.indptr), shape=sub.shape)
+        return v @ gram + weights @ factors
+
+    b = csr_matrix((conf, sub.indices, sub.indptr), shape=sub.shape) @ factors
+    x = x[rows].copy()
+    r = b - apply(x)
+    p = r.copy()
+    rs = np.einsum("ij,ij->i", r, r)
+    for _ in range(steps):
+        if not (rs > 1e-20).any():
+            break
+        ap = apply(p)
+        denom = np.einsum("ij,ij->i", p, ap)
+        step = np.divide(rs, denom, out=np.zeros_like(rs), where=(rs > 1e-20) & (denom > 0))
+        x += step[:, None] * p
+        r -= step[:, None] * ap
+        rs_new = np.einsum("ij,ij->i", r, r)
+        p = r + np.divide(rs_new, rs, out=np.zeros_like(rs), where=rs > 1e-20)[:, None] * p
+        rs = rs_new
+    return x
+
+
+class ALSCollaborativeFiltering(CollaborativeFiltering):
+    """Implicit-feedback matrix factorization (ALS with a conjugate-gradient solver).
+
+    Uses the same user x item CSR as `CollaborativeFiltering` (rating, else
+    quantity, else 1.0) as confidence 1 + alpha * value, and learns float32
+    user and item factors instead of an items x items similarity matrix.
+    Each half-sweep solves blocks of `block_size` rows on `workers` threads;
+    scoring a block of users is one (users x k) . (k x items) product.
+    """
+    backend = "als"
+
+    def __init__(self, min_interactions_user=1, min_interactions_item=1, factors=64, regularization=0.01,
+                 alpha=1.0, iterations=15, cg_steps=3, block_size=4096, workers=None, seed=0):
+        super().__init__(min_interactions_user, min_interactions_item, neighbors_k=None, block_size=block_size)
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.cg_steps = cg_steps
+        self.workers = workers
+        self.seed = seed
+        self.user_factors = None  # users x factors float32
+        self.item_factors = None  # items x factors float32
+
+    @classmethod
+    def from_config(cls, config, min_interactions_user=1, min_interactions_item=1):
+        """Build from the `recommender.als` config section."""
+        c = config or {}
+        return cls(
+            min_interactions_user, min_interactions_item,
+            factors=c.get("factors", 64), regularization=c.get("regularization", 0.01), alpha=c.get("alpha", 1.0),
+            iterations=c.get("iterations", 15), cg_steps=c.get("cg_steps", 3), block_size=c.get("block_size", 4096),
+            workers=c.get("workers"), seed=c.get("seed", 0),
+        )
+
+    def params(self) -> dict:
+        """Hyper-parameters recorded in the artifact manifest."""
+        return {
+            "factors": self.factors, "regularization": self.regularization, "alpha": self.alpha,
+            "iterations": self.iterations, "cg_steps": self.cg_steps, "seed": self.seed,
+        }
+
+    def fit_arrays(self, customer_ids, product_ids, quantity=None, rating=None):
+        """Fit from parallel interaction arrays (see `models.interactions.Interactions`)."""
+        self._build_matrix(customer_ids, product_ids, quantity, rating)
+        self.matrix = self.matrix.astype(np.float32)
+        rng = np.random.default_rng(self.seed)
+        n_users, n_items = self.matrix.shape
+        self.user_factors = (rng.standard_normal((n_users, self.factors)) * 0.01).astype(np.float32)
+        self.item_factors = (rng.standard_normal((n_items, self.factors)) * 0.01).astype(np.float32)
+        self.item_sims = None
+
+        by_item = self.matrix.T.tocsr()
+        with ThreadPoolExecutor(max_workers=self.workers or os.cpu_count()) as pool:
+            for _ in range(self.iterations):
+                self._solve(self.matrix, np.arange(n_users), self.user_factors, self.item_factors, pool)
+                self._solve(by_item, np.arange(n_items), self.item_factors, self.user_factors, pool)
+        return self
+
+    def _solve(self, interactions, rows, target, fixed, pool, steps=None):
+        """Update `target[rows]` in place against the `fixed` factors, one block per task."""
+        fixed = np.ascontiguousarray(fixed)
+        gram = fixed.T @ fixed + np.float32(self.regularization) * np.eye(self.factors, dtype=np.float32)
+        steps = steps or self.cg_steps
+
+        def run(block):
+            target[block] = _conjugate_gradient(interactions, block, target, fixed, gram, self.alpha, steps)
+
+        blocks = [rows[s:s + self.block_size] for s in range(0, len(rows), self.block_size)]
+        list(pool.map(run, blocks))
+
+    def restore(self, user_ids, item_ids, matrix, user_factors, item_factors, signal=None):
+        """Rebuild a fitted model from persisted arrays instead of calling `fit`."""
+        super().restore(user_ids, item_ids, matrix, None, signal=signal)
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        return self
+
+    def update(self, interactions: pd.DataFrame):
+        """Fold new interactions into a fitted model without refitting from zero.
+
+        Unseen users and items get zero factors; the touched users, then the
+        touched items, then the touched users again are re-solved against the
+        current factors. The min_interactions_* filters are not re-applied.
+        """
+        if self.matrix is None:
+            raise ValueError("Model not fit.")
+        if interactions.empty:
+            return self
+        users, items = self._append(interactions)
+        self.matrix = self.matrix.astype(np.float32)
+        n_users, n_items = self.matrix.shape
+        self.user_factors = np.vstack([self.user_factors, np.zeros((n_users - len(self.user_factors), self.factors),
+                                                                   dtype=np.float32)])
+        self.item_factors = np.vstack([self.item_factors, np.zeros((n_items - len(self.item_factors), self.factors),
+                                                                   dtype=np.float32)])
+        steps = max(self.cg_steps, self.factors)  # new rows start from zero: solve (near) exactly
+        with ThreadPoolExecutor(max_workers=self.workers or os.cpu_count()) as pool:
+            self._solve(self.matrix, users, self.user_factors, self.item_factors, pool, steps)
+            self._solve(self.matrix.T.tocsr(), items, self.item_factors, self.user_factors, pool, steps)
+            self._solve(self.matrix, users, self.user_factors, self.item_factors, pool, steps)
+        return self
+
+    def score_user(self, customer_id: int):
+        """Scores over all items (in `item_index` order), or None for unknown users."""
+        if self.matrix is None:
+            raise ValueError("Model not fit.")
+        if customer_id not in self.user_index:
+            return None
+        return (self.item_factors @ self.user_factors[self.user_index[customer_id]]).astype(float)
+
+    def score_users(self, customer_ids):
+        """Scores for a block of users as one dense (users x k) . (k x items) product.
+
+        Returns (known, scores): a boolean mask over `customer_ids` and a dense
+        len(customer_ids) x items array whose rows are zero for unknown users.
+        """
+        if self.matrix is None:
+            raise ValueError("Model not fit.")
+        rows = np.array([self.user_index.get(cid, -1) for cid in customer_ids], dtype=np.int64)
+        known = rows >= 0
+        scores = np.zeros((len(rows), self.matrix.shape[1]))
+        if known.any():
+            scores[known] = self.user_factors[rows[known]] @ self.item_factors.T
+        return known, scores
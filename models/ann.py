@@ -0,0 +1,141 @@
+# models/ann.py
+"""Approximate nearest neighbours over reduced product-text embeddings, in NumPy.
+
+`embed` maps the TF-IDF matrix to a dense, L2-normalized float32 embedding
+(truncated SVD or a Gaussian random projection). `IVFIndex` clusters the
+embedding with spherical k-means and, per query, only scans the items of the
+`n_probe` closest clusters: more probes means higher recall and slower queries.
+"""
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .ranking import top_k_desc
+
+EMBED_METHODS = ("svd", "random")
+
+
+def _normalize(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (x / norms).astype(np.float32, copy=False)
+
+
+def embed(matrix, dim=128, method="svd", seed=0):
+    """Dense (items x dim) L2-normalized float32 embedding of a sparse TF-IDF matrix."""
+    if method not in EMBED_METHODS:
+        raise ValueError(f"Unknown embedding method {method!r}; expected one of {EMBED_METHODS}.")
+    matrix = csr_matrix(matrix, dtype=np.float32)
+    if method == "svd":
+        from scipy.sparse.linalg import svds
+
+        k = min(dim, min(matrix.shape) - 1)
+        if k < 1:
+            return _normalize(matrix.toarray())
+        u, s, _ = svds(matrix, k=k, random_state=seed)
+        return _normalize(u * s)
+    rng = np.random.default_rng(seed)
+    projection = rng.standard_normal((matrix.shape[1], dim)).astype(np.float32) / np.sqrt(dim)
+    return _normalize(np.asarray(matrix @ projection))
+
+
+def _assign(x, centroids, block_size=8192):
+    labels = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), block_size):
+        labels[start:start + block_size] = np.argmax(x[start:start + block_size] @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(x, n_clusters, iterations=10, seed=0):
+    """Cluster unit vectors by cosine; returns (centroids, labels)."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=n_clusters, replace=False)].copy()
+    labels = _assign(x, centroids)
+    for _ in range(iterations):
+        member = csr_matrix((np.ones(len(x), dtype=np.float32), (labels, np.arange(len(x)))),
+                            shape=(n_clusters, len(x)))
+        sums = np.asarray(member @ x)
+        empty = np.flatnonzero(np.asarray(member.sum(axis=1)).ravel() == 0)
+        sums[empty] = x[rng.choice(len(x), size=len(empty), replace=False)]  # reseed empty clusters
+        centroids = _normalize(sums)
+        new_labels = _assign(x, centroids)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    return centroids, labels
+
+
+class IVFIndex:
+    """Inverted-file index: items grouped by their nearest centroid.
+
+    `order[offsets[c]:offsets[c + 1]]` are the item positions of cluster c.
+    """
+    def __init__(self, embedding, centroids, order, offsets, n_probe=16):
+        self.embedding = embedding
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, embedding, n_lists=None, n_probe=16, iterations=10, seed=0):
+        n = len(embedding)
+        if n_lists is None:
+            n_lists = int(np.sqrt(n))
+        n_lists = max(1, min(n_lists, n))
+        centroids, labels = spherical_kmeans(embedding, n_lists, iterations=iterations, seed=seed)
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=offsets[1:])
+        return cls(embedding, centroids, order, offsets, n_probe=n_probe)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def candidates(self, position, n_probe=None):
+        """Item positions in the `n_probe` clusters closest to item `position`."""
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        lists = top_k_desc(self.centroids @ self.embedding[position], n_probe)
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+
+    def search(self, position, k, n_probe=None):
+        """Approximate top-k (positions, embedding cosine) neighbours of item `position`."""
+        cand = self.candidates(position, n_probe)
+        sims = self.embedding[cand] @ self.embedding[position]
+        top = top_k_desc(sims, k)
+        return cand[top], sims[top]
+
+
+def recall_report(model, product_ids, k=10, n_probes=(1, 2, 4, 8, 16)):
+    """recall@k of `model.recommend_similar` with the ANN index against exact search.
+
+    A returned product counts as a hit when its (exact, re-ranked) score reaches
+    the k-th exact score, so ties at the cutoff are not penalized. Returns one
+    row per n_probe with mean recall, mean candidates scanned and per-query
+    latency of both paths.
+    """
+    start = time.perf_counter()
+    exact = {pid: model.recommend_similar(pid, top_n=k, exact=True) for pid in product_ids}
+    exact_ms = 1000.0 * (time.perf_counter() - start) / max(len(product_ids), 1)
+    rows = []
+    for n_probe in n_probes:
+        hits, scanned = [], []
+        start = time.perf_counter()
+        approx = {pid: model.recommend_similar(pid, top_n=k, n_probe=n_probe) for pid in product_ids}
+        ann_ms = 1000.0 * (time.perf_counter() - start) / max(len(product_ids), 1)
+        for pid in product_ids:
+            truth = exact[pid]
+            if truth:
+                cutoff = truth[-1][1] - 1e-9
+                hits.append(sum(score >= cutoff for _, score in approx[pid][:len(truth)]) / len(truth))
+            scanned.append(len(model.ann_index.candidates(model.index.position(pid), n_probe)))
+        rows.append({
+            "n_probe": n_probe,
+            f"recall@{k}": float(np.mean(hits)) if hits else 1.0,
+            "mean_candidates": float(np.mean(scanned)),
+            "ann_ms": ann_ms,
+            "exact_ms": exact_ms,
+        })
+    return rows
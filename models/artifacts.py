@@ -0,0 +1,278 @@
+# models/artifacts.py
+"""Versioned on-disk model artifacts.
+
+Layout of an artifact root:
+
+    <root>/LATEST                 name of the newest complete version
+    <root>/<version>/manifest.json
+    <root>/<version>/<name>.npy   plain arrays
+    <root>/<version>/<name>/      CSR matrices as data/indices/indptr .npy files,
+                                  or the product catalog as one .npy per column
+
+CSR components are stored as raw .npy files rather than a zipped .npz so they
+can be memory-mapped on load. Nothing is pickled, so artifacts do not depend on
+the pandas version that wrote them.
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, issparse
+
+from .ann import IVFIndex
+from .history_index import PurchaseHistoryIndex
+
+ARTIFACT_FORMAT = 2  # 2: product catalog as .npy columns instead of products.pkl
+LATEST_FILE = "LATEST"
+
+
+def new_version(fingerprint: str) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    return f"{stamp}-{fingerprint[:8]}"
+
+
+def save_sparse(directory: Path, name: str, matrix) -> dict:
+    matrix = csr_matrix(matrix)
+    sub = directory / name
+    sub.mkdir(parents=True, exist_ok=True)
+    np.save(sub / "data.npy", matrix.data)
+    np.save(sub / "indices.npy", matrix.indices)
+    np.save(sub / "indptr.npy", matrix.indptr)
+    return {"kind": "csr", "shape": list(matrix.shape)}
+
+
+def load_sparse(directory: Path, name: str, shape, mmap=True):
+    mode = "r" if mmap else None
+    sub = directory / name
+    data = np.load(sub / "data.npy", mmap_mode=mode)
+    indices = np.load(sub / "indices.npy", mmap_mode=mode)
+    indptr = np.load(sub / "indptr.npy", mmap_mode=mode)
+    return csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+
+
+def save_matrix(directory: Path, name: str, matrix) -> dict:
+    if issparse(matrix):
+        return save_sparse(directory, name, matrix)
+    np.save(directory / f"{name}.npy", np.asarray(matrix))
+    return {"kind": "dense", "shape": list(np.shape(matrix))}
+
+
+def load_matrix(directory: Path, name: str, meta: dict, mmap=True):
+    if meta["kind"] == "csr":
+        return load_sparse(directory, name, meta["shape"], mmap=mmap)
+    return np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+
+
+def save_frame(directory: Path, name: str, df: pd.DataFrame) -> dict:
+    """One .npy per column: numbers as-is, categoricals as codes + categories, text as unicode + a null mask."""
+    sub = directory / name
+    sub.mkdir(parents=True, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            categories = s.cat.categories.to_numpy()
+            np.save(sub / f"{i}_codes.npy", s.cat.codes.to_numpy())
+            np.save(sub / f"{i}_categories.npy", categories.astype(str) if categories.dtype == object else categories)
+            kind = "category"
+        elif pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+            np.save(sub / f"{i}.npy", s.to_numpy())
+            kind = "numeric"
+        else:
+            np.save(sub / f"{i}.npy", s.astype(object).where(s.notna(), "").to_numpy().astype(str))
+            np.save(sub / f"{i}_isna.npy", s.isna().to_numpy())
+            kind = "text"
+        columns.append({"name": col, "kind": kind, "dtype": str(s.dtype)})
+    return {"kind": "frame", "rows": len(df), "columns": columns}
+
+
+def load_frame(directory: Path, name: str, meta: dict) -> pd.DataFrame:
+    sub = directory / name
+    data = {}
+    for i, col in enumerate(meta["columns"]):
+        if col["kind"] == "category":
+            data[col["name"]] = pd.Categorical.from_codes(np.load(sub / f"{i}_codes.npy"),
+                                                          np.load(sub / f"{i}_categories.npy"))
+        elif col["kind"] == "numeric":
+            data[col["name"]] = np.load(sub / f"{i}.npy")
+        else:
+            values = pd.Series(np.load(sub / f"{i}.npy"), dtype=object)
+            data[col["name"]] = values.where(~np.load(sub / f"{i}_isna.npy"), None).astype(col["dtype"])
+    return pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]))
+
+
+def resolve_version(root, version=None) -> Path:
+    root = Path(root)
+    if version is None:
+        latest = root / LATEST_FILE
+        if not latest.exists():
+            raise FileNotFoundError(f"No model artifacts found under {root}.")
+        version = latest.read_text(encoding="utf-8").strip()
+    path = root / version
+    if not (path / "manifest.json").exists():
+        raise FileNotFoundError(f"Model artifact {path} is missing or incomplete.")
+    return path
+
+
+def read_manifest(path: Path) -> dict:
+    with open(Path(path) / "manifest.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_artifacts(root, version, fingerprint, collab, content, popularity, products_df,
+                    history_index=None, watermark=None, last_transaction_id=None, popularity_half_life=None,
+                    keep=3) -> Path:
+    """Write a complete artifact version and point LATEST at it.
+
+    The version is staged in a temporary directory and renamed into place, so
+    readers never observe a half-written artifact.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    staging = root / f".tmp-{version}"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": version,
+        "fingerprint": fingerprint,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "watermark": None if watermark is None or pd.isna(watermark) else str(watermark),
+        "last_transaction_id": None if last_transaction_id is None else int(last_transaction_id),
+        "popularity_half_life_days": popularity_half_life,
+        "matrices": {},
+    }
+
+    if collab is not None and collab.matrix is not None:
+        users = np.array([collab.index_user[i] for i in range(len(collab.index_user))])
+        items = np.array([collab.index_item[i] for i in range(len(collab.index_item))])
+        np.save(staging / "collab_user_ids.npy", users)
+        np.save(staging / "collab_item_ids.npy", items)
+        manifest["matrices"]["collab_matrix"] = save_sparse(staging, "collab_matrix", collab.matrix)
+        manifest["collaborative"] = {
+            "backend": collab.backend,
+            "min_interactions_user": collab.min_interactions_user,
+            "min_interactions_item": collab.min_interactions_item,
+            "neighbors_k": collab.neighbors_k,
+            "block_size": collab.block_size,
+            "signal": collab.signal,
+        }
+        if collab.backend == "als":
+            manifest["matrices"]["collab_user_factors"] = save_matrix(staging, "collab_user_factors", collab.user_factors)
+            manifest["matrices"]["collab_item_factors"] = save_matrix(staging, "collab_item_factors", collab.item_factors)
+            manifest["collaborative"]["als"] = collab.params()
+        else:
+            manifest["matrices"]["collab_item_sims"] = save_matrix(staging, "collab_item_sims", collab.item_sims)
+
+    if content is not None and content.matrix is not None:
+        np.save(staging / "content_product_ids.npy", np.asarray(content.product_ids))
+        manifest["matrices"]["content_tfidf"] = save_sparse(staging, "content_tfidf", content.matrix)
+        terms, idf = content.vocabulary()
+        np.save(staging / "content_terms.npy", np.asarray(terms).astype(str))
+        np.save(staging / "content_idf.npy", np.asarray(idf))
+        manifest["content"] = {
+            "text_fields": list(content.text_fields),
+            "max_features": content.max_features,
+        }
+        ann = content.ann_index
+        if ann is not None:
+            np.save(staging / "content_embedding.npy", ann.embedding)
+            np.save(staging / "ann_centroids.npy", ann.centroids)
+            np.save(staging / "ann_order.npy", ann.order)
+            np.save(staging / "ann_offsets.npy", ann.offsets)
+            manifest["content"]["ann"] = {**(content.ann or {}), "n_lists": ann.n_lists, "n_probe": ann.n_probe}
+
+    np.save(staging / "popularity_ids.npy", popularity.index.to_numpy())
+    np.save(staging / "popularity_values.npy", popularity.to_numpy(dtype=float))
+    manifest["products"] = save_frame(staging, "products", products_df.reset_index(drop=True))
+    if history_index is not None:
+        np.save(staging / "history_customer_ids.npy", history_index.customer_ids)
+        np.save(staging / "history_offsets.npy", history_index.offsets)
+        np.save(staging / "history_product_ids.npy", history_index.product_ids)
+        manifest["history"] = True
+
+    with open(staging / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    final = root / version
+    if final.exists():
+        shutil.rmtree(final)
+    os.replace(staging, final)
+    tmp_latest = root / f".{LATEST_FILE}.tmp"
+    tmp_latest.write_text(version, encoding="utf-8")
+    os.replace(tmp_latest, root / LATEST_FILE)
+    prune(root, keep=keep)
+    return final
+
+
+def prune(root, keep=3):
+    """Remove all but the newest `keep` versions (LATEST is always kept)."""
+    root = Path(root)
+    latest = (root / LATEST_FILE).read_text(encoding="utf-8").strip() if (root / LATEST_FILE).exists() else None
+    versions = sorted(p.name for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for name in versions[:-keep] if keep else []:
+        if name != latest:
+            shutil.rmtree(root / name, ignore_errors=True)
+
+
+def read_artifacts(path, mmap=True) -> dict:
+    """Load the arrays of one artifact version into plain Python/NumPy objects."""
+    path = Path(path)
+    manifest = read_manifest(path)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format')} in {path}.")
+    mats = manifest["matrices"]
+    out = {"manifest": manifest}
+
+    if "collab_matrix" in mats:
+        out["collab"] = {
+            "user_ids": np.load(path / "collab_user_ids.npy"),
+            "item_ids": np.load(path / "collab_item_ids.npy"),
+            "matrix": load_sparse(path, "collab_matrix", mats["collab_matrix"]["shape"], mmap=mmap),
+            "signal": manifest["collaborative"].get("signal"),
+        }
+        if "collab_item_factors" in mats:
+            for name in ("user_factors", "item_factors"):
+                out["collab"][name] = load_matrix(path, f"collab_{name}", mats[f"collab_{name}"], mmap=mmap)
+        else:
+            out["collab"]["item_sims"] = load_matrix(path, "collab_item_sims", mats["collab_item_sims"], mmap=mmap)
+
+    if "content_tfidf" in mats:
+        out["content"] = {
+            "product_ids": np.load(path / "content_product_ids.npy"),
+            "matrix": load_sparse(path, "content_tfidf", mats["content_tfidf"]["shape"], mmap=mmap),
+            "terms": np.load(path / "content_terms.npy"),
+            "idf": np.load(path / "content_idf.npy"),
+        }
+        ann = manifest["content"].get("ann")
+        if ann is not None:
+            mode = "r" if mmap else None
+            out["content"]["ann_index"] = IVFIndex(
+                np.load(path / "content_embedding.npy", mmap_mode=mode),
+                np.load(path / "ann_centroids.npy"),
+                np.load(path / "ann_order.npy", mmap_mode=mode),
+                np.load(path / "ann_offsets.npy"),
+                n_probe=ann["n_probe"],
+            )
+
+    out["popularity"] = pd.Series(
+        np.load(path / "popularity_values.npy"),
+        index=pd.Index(np.load(path / "popularity_ids.npy"), name="product_id"),
+        name="quantity",
+    )
+    out["products"] = load_frame(path, "products", manifest["products"])
+    out["history"] = None
+    if manifest.get("history"):
+        mode = "r" if mmap else None
+        out["history"] = PurchaseHistoryIndex(
+            np.load(path / "history_customer_ids.npy", mmap_mode=mode),
+            np.load(path / "history_offsets.npy", mmap_mode=mode),
+            np.load(path / "history_product_ids.npy", mmap_mode=mode),
+        )
+    return out
@@ -0,0 +1,109 @@
+# models/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from .instrumentation import metrics
+
+
+class RecommendationCache:
+    """Bounded LRU + TTL cache for recommendation results, safe to share across threads.
+
+    Keys are (customer_id, top_n, model_version), so results from an older model are
+    never served after a swap. `invalidate_customer` drops every entry of one
+    customer, e.g. when their transactions change.
+    """
+    def __init__(self, max_entries=10000, ttl_seconds=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._by_customer = {}  # customer_id -> set of keys
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_customer.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_customer[key[0]]
+
+    def get(self, customer_id, top_n, model_version):
+        key = (customer_id, top_n, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                metrics.inc("cache_lookups_total", result="miss")
+                return None
+            if entry[0] <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                metrics.inc("cache_lookups_total", result="expired")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.inc("cache_lookups_total", result="hit")
+            return entry[1]
+
+    def put(self, customer_id, top_n, model_version, value):
+        key = (customer_id, top_n, model_version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._by_customer.setdefault(customer_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate_customer(self, customer_id):
+        with self._lock:
+            keys = list(self._by_customer.get(customer_id, ()))
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_customer.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    @classmethod
+    def from_config(cls, config, enabled=False):
+        """Cache from the `cache` config section, or None when disabled.
+
+        `enabled` is the default when the section does not set it: off for
+        offline callers (CLI, export, evaluation), which must see `update()`s
+        made by other processes; the server and dashboard pass True.
+        """
+        cfg = (config or {}).get("cache", {})
+        if not cfg.get("enabled", enabled):
+            return None
+        return cls(max_entries=cfg.get("max_entries", 10000), ttl_seconds=cfg.get("ttl_seconds", 300.0))
@@ -0,0 +1,47 @@
+# models/catalog.py
+import numpy as np
+import pandas as pd
+
+from .id_index import IdIndex
+
+DECORATION_COLUMNS = ["product_name", "category", "subcategory", "brand", "price"]
+
+
+class ProductCatalog:
+    """Columnar product metadata with a product_id -> row position index.
+
+    Built once from the products table; decorating recommendations is a single
+    vectorized take per column instead of a boolean scan of the frame per item.
+    """
+    def __init__(self, product_ids, columns):
+        self.index = IdIndex(product_ids)
+        self.columns = columns  # {name: ndarray aligned with product_ids}
+
+    @classmethod
+    def from_frame(cls, products: pd.DataFrame, columns=None):
+        columns = columns or [c for c in DECORATION_COLUMNS if c in products]
+        return cls(products["product_id"].to_numpy(), {c: products[c].to_numpy() for c in columns})
+
+    @property
+    def product_ids(self):
+        return self.index.ids
+
+    def __len__(self):
+        return len(self.index)
+
+    def take(self, product_ids) -> pd.DataFrame:
+        """Metadata rows for `product_ids`, in order; unknown ids get missing values."""
+        pos = self.index.positions(product_ids)
+        missing = pos < 0
+        safe = np.where(missing, 0, pos)
+        out = {}
+        for name, values in self.columns.items():
+            if len(values) == 0:
+                col = np.full(len(pos), None, dtype=object)
+            else:
+                col = values[safe]
+                if missing.any():
+                    col = col.astype(object)
+                    col[missing] = None
+            out[name] = col
+        return pd.DataFrame(out)
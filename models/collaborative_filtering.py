@@ -1,66 +1,268 @@
 # models/collaborative_filtering.py
 import numpy as np
 import pandas as pd
-from scipy.sparse import csr_matrix
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix, diags, issparse
+
+from .sharded_similarity import sharded_item_similarities
+
+# scikit-learn is imported where similarities are computed, so scoring a
+# restored model does not pay for it.
+
+
+def _dense_row(x):
+    """Flatten a 1 x n sparse/dense product into a 1-D ndarray."""
+    if issparse(x):
+        return x.toarray().ravel()
+    return np.asarray(x).ravel()
+
+
+def topk_item_neighbors(matrix, k, block_size=1024, rows=None):
+    """Top-K cosine neighbors per item as an items x items CSR matrix.
+
+    Similarities are computed block by block from the L2-normalized item vectors,
+    so at most `block_size` x items dense scores are alive at any time.
+    Self-similarity is dropped and only strictly positive neighbors are kept.
+    With `rows` given, only those items' neighbor lists are computed (the other
+    rows of the result are empty).
+    """
+    from sklearn.preprocessing import normalize
+
+    items = normalize(matrix.T.tocsr(), norm="l2", axis=1)  # items x users
+    items_t = items.T.tocsr()
+    n_items = items.shape[0]
+    k = max(0, min(int(k), n_items - 1))
+    rows = np.arange(n_items) if rows is None else np.asarray(rows, dtype=np.int64)
+
+    out_rows, out_cols, out_data = [], [], []
+    for start in range(0, len(rows) if k else 0, block_size):
+        ids = rows[start:start + block_size]
+        block = (items[ids] @ items_t).toarray()
+        block[np.arange(len(ids)), ids] = 0.0
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        vals = np.take_along_axis(block, top, axis=1)
+        keep = vals > 0
+        out_rows.append(np.broadcast_to(ids[:, None], top.shape)[keep])
+        out_cols.append(top[keep])
+        out_data.append(vals[keep])
+
+    def cat(parts, dtype):
+        return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+    sims = csr_matrix(
+        (cat(out_data, np.float32), (cat(out_rows, np.int64), cat(out_cols, np.int32))),
+        shape=(n_items, n_items),
+    )
+    sims.sort_indices()
+    return sims
 
 
 class CollaborativeFiltering:
-    """Implicit item-based collaborative filtering using purchase counts (quantity) or ratings."""
-    def __init__(self, min_interactions_user=1, min_interactions_item=1):
+    """Implicit item-based collaborative filtering using purchase counts (quantity) or ratings.
+
+    With `neighbors_k` set, `item_sims` holds only the top-K neighbors per item as a
+    sparse CSR matrix instead of the dense items x items cosine matrix.
+    """
+    backend = "item_knn"
+
+    def __init__(self, min_interactions_user=1, min_interactions_item=1, neighbors_k=None, block_size=1024,
+                 workers=1, tmp_dir=None):
         self.min_interactions_user = min_interactions_user
         self.min_interactions_item = min_interactions_item
+        self.neighbors_k = neighbors_k
+        self.block_size = block_size
+        self.workers = workers  # > 1: similarities in row shards across a process pool
+        self.tmp_dir = tmp_dir  # scratch space for the sharded similarity files
         self.user_index = {}
         self.item_index = {}
         self.index_user = {}
         self.index_item = {}
         self.matrix = None  # users x items CSR
-        self.item_sims = None
+        self.item_sims = None  # dense ndarray, or CSR top-K neighbors
+        self.signal = None  # "rating", "quantity" or None (implicit 1.0), chosen at fit
 
-    def _filter(self, interactions: pd.DataFrame):
-        u_counts = interactions.groupby("customer_id").size()
-        keep_users = u_counts[u_counts >= self.min_interactions_user].index
-        i_counts = interactions.groupby("product_id").size()
-        keep_items = i_counts[i_counts >= self.min_interactions_item].index
-        return interactions[(interactions.customer_id.isin(keep_users)) & (interactions.product_id.isin(keep_items))]
+    def _keep_mask(self, customer_ids, product_ids):
+        """Rows whose user and item both meet the min_interactions_* thresholds."""
+        keep = np.ones(len(customer_ids), dtype=bool)
+        for ids, minimum in ((customer_ids, self.min_interactions_user), (product_ids, self.min_interactions_item)):
+            if minimum > 1:
+                _, inverse, counts = np.unique(ids, return_inverse=True, return_counts=True)
+                keep &= counts[inverse] >= minimum
+        return keep
 
     def fit(self, interactions: pd.DataFrame):
         # expected cols: customer_id, product_id, quantity OR rating
-        df = interactions.copy()
-        df = self._filter(df)
+        def column(name):
+            return interactions[name].to_numpy(dtype=float, na_value=np.nan) if name in interactions else None
+
+        return self.fit_arrays(
+            interactions["customer_id"].to_numpy(),
+            interactions["product_id"].to_numpy(),
+            quantity=column("quantity"),
+            rating=column("rating"),
+        )
+
+    def fit_arrays(self, customer_ids, product_ids, quantity=None, rating=None):
+        """Fit from parallel interaction arrays (see `models.interactions.Interactions`)."""
+        self._build_matrix(customer_ids, product_ids, quantity, rating)
+
+        # cosine similarity item-item
+        if self.workers and self.workers > 1:
+            self.item_sims = sharded_item_similarities(self.matrix, self.neighbors_k, workers=self.workers,
+                                                       block_size=self.block_size, tmp_dir=self.tmp_dir)
+        elif self.neighbors_k:
+            self.item_sims = topk_item_neighbors(self.matrix, self.neighbors_k, self.block_size)
+        else:
+            from sklearn.metrics.pairwise import cosine_similarity
+
+            self.item_sims = cosine_similarity(self.matrix.T)
+        return self
+
+    def _build_matrix(self, customer_ids, product_ids, quantity=None, rating=None):
+        """Filter the interactions, choose the signal and build the indices and user x item CSR."""
+        keep = self._keep_mask(customer_ids, product_ids)
+        customer_ids, product_ids = customer_ids[keep], product_ids[keep]
+        quantity = quantity[keep] if quantity is not None else None
+        rating = rating[keep] if rating is not None else None
 
         # signal: rating if available else quantity else 1
-        if "rating" in df and df["rating"].notna().any():
-            signal = df["rating"].fillna(0)
-        elif "quantity" in df:
-            signal = df["quantity"].fillna(1)
+        if rating is not None and (~np.isnan(rating)).any():
+            self.signal = "rating"
+            data = np.where(np.isnan(rating), 0.0, rating)
+        elif quantity is not None:
+            self.signal = "quantity"
+            data = np.where(np.isnan(quantity), 1.0, quantity)
         else:
-            signal = 1.0
+            self.signal = None
+            data = np.ones(len(customer_ids))
 
-        users = df.customer_id.unique().tolist()
-        items = df.product_id.unique().tolist()
+        users = pd.unique(customer_ids).tolist()
+        items = pd.unique(product_ids).tolist()
         self.user_index = {u: i for i, u in enumerate(users)}
         self.item_index = {p: i for i, p in enumerate(items)}
         self.index_user = {i: u for u, i in self.user_index.items()}
         self.index_item = {i: p for p, i in self.item_index.items()}
 
-        rows = df.customer_id.map(self.user_index)
-        cols = df.product_id.map(self.item_index)
-        data = pd.Series(signal).astype(float)
-        self.matrix = csr_matrix((data, (rows, cols)), shape=(len(users), len(items)))
+        rows = pd.Index(users).get_indexer(customer_ids)
+        cols = pd.Index(items).get_indexer(product_ids)
+        self.matrix = csr_matrix((data.astype(float), (rows, cols)), shape=(len(users), len(items)))
 
-        # cosine similarity item-item
-        self.item_sims = cosine_similarity(self.matrix.T)
+    def _signal_values(self, df):
+        if self.signal == "rating":
+            return df["rating"].fillna(0)
+        if self.signal == "quantity" and "quantity" in df:
+            return df["quantity"].fillna(1)
+        return 1.0
+
+    def restore(self, user_ids, item_ids, matrix, item_sims, signal=None):
+        """Rebuild a fitted model from persisted arrays instead of calling `fit`."""
+        users = user_ids.tolist()
+        items = item_ids.tolist()
+        self.user_index = {u: i for i, u in enumerate(users)}
+        self.item_index = {p: i for i, p in enumerate(items)}
+        self.index_user = dict(enumerate(users))
+        self.index_item = dict(enumerate(items))
+        self.matrix = matrix
+        self.item_sims = item_sims
+        self.signal = signal
         return self
 
-    def recommend_for_user(self, customer_id: int, top_n=10, exclude_items=None):
+    def _append(self, interactions: pd.DataFrame):
+        """Add new interactions to the indices and CSR; returns the touched (user rows, item columns)."""
+        for uid in interactions.customer_id.unique().tolist():
+            if uid not in self.user_index:
+                self.index_user[len(self.user_index)] = uid
+                self.user_index[uid] = len(self.user_index)
+        for pid in interactions.product_id.unique().tolist():
+            if pid not in self.item_index:
+                self.index_item[len(self.item_index)] = pid
+                self.item_index[pid] = len(self.item_index)
+        n_users, n_items = len(self.user_index), len(self.item_index)
+
+        rows = interactions.customer_id.map(self.user_index).to_numpy()
+        cols = interactions.product_id.map(self.item_index).to_numpy()
+        data = pd.Series(self._signal_values(interactions), index=interactions.index).astype(float).to_numpy()
+        delta = csr_matrix((data, (rows, cols)), shape=(n_users, n_items))
+        old = self.matrix
+        grown = csr_matrix(
+            (old.data, old.indices, np.concatenate([old.indptr, np.full(n_users - old.shape[0], old.indptr[-1])])),
+            shape=(n_users, n_items),
+        )
+        self.matrix = (grown + delta).tocsr()
+        return np.unique(rows), np.unique(cols)
+
+    def update(self, interactions: pd.DataFrame):
+        """Fold new interactions into a fitted model without refitting from zero.
+
+        Unseen users and items are appended to the indices, the new signal is added
+        to the user-item CSR, and only similarities involving changed items are
+        recomputed: the touched items' rows/columns for the dense matrix, or the
+        neighbor lists of every item co-purchased with a touched item for top-K.
+        The min_interactions_* filters are not re-applied to the new rows.
+        """
+        if self.matrix is None:
+            raise ValueError("Model not fit.")
+        if interactions.empty:
+            return self
+        old_items = self.matrix.shape[1]
+        _, touched = self._append(interactions)
+        n_items = self.matrix.shape[1]
+        if self.neighbors_k:
+            buyers = np.unique(self.matrix[:, touched].tocoo().row)
+            affected = np.union1d(touched, np.unique(self.matrix[buyers].indices))
+            old_sims = self.item_sims.tocsr()
+            old_sims = csr_matrix(
+                (old_sims.data, old_sims.indices,
+                 np.concatenate([old_sims.indptr, np.full(n_items - old_items, old_sims.indptr[-1])])),
+                shape=(n_items, n_items),
+            )
+            keep = np.ones(n_items, dtype=np.float32)
+            keep[affected] = 0.0
+            kept = diags(keep) @ old_sims
+            kept.eliminate_zeros()
+            fresh = topk_item_neighbors(self.matrix, self.neighbors_k, self.block_size, rows=affected)
+            self.item_sims = (kept + fresh).tocsr()
+            self.item_sims.sort_indices()
+        else:
+            from sklearn.metrics.pairwise import cosine_similarity
+
+            sims = np.zeros((n_items, n_items))
+            sims[:old_items, :old_items] = self.item_sims
+            fresh = cosine_similarity(self.matrix.T[touched], self.matrix.T)
+            sims[touched, :] = fresh
+            sims[:, touched] = fresh.T
+            self.item_sims = sims
+        return self
+
+    def score_user(self, customer_id: int):
+        """Scores over all items (in `item_index` order), or None for unknown users."""
         if self.matrix is None:
             raise ValueError("Model not fit.")
         if customer_id not in self.user_index:
-            return []
+            return None
         uidx = self.user_index[customer_id]
         user_vector = self.matrix[uidx]  # 1 x items
-        scores = user_vector.dot(self.item_sims).A1
+        return _dense_row(user_vector.dot(self.item_sims)).astype(float)
+
+    def score_users(self, customer_ids):
+        """Scores for a block of users as one sparse (users x items) . (items x items) product.
+
+        Returns (known, scores): a boolean mask over `customer_ids` and a dense
+        len(customer_ids) x items array whose rows are zero for unknown users.
+        """
+        if self.matrix is None:
+            raise ValueError("Model not fit.")
+        rows = np.array([self.user_index.get(cid, -1) for cid in customer_ids], dtype=np.int64)
+        known = rows >= 0
+        scores = np.zeros((len(rows), self.matrix.shape[1]))
+        if known.any():
+            block = self.matrix[rows[known]].dot(self.item_sims)
+            scores[known] = block.toarray() if issparse(block) else np.asarray(block)
+        return known, scores
+
+    def recommend_for_user(self, customer_id: int, top_n=10, exclude_items=None):
+        scores = self.score_user(customer_id)
+        if scores is None:
+            return []
 
         # exclude purchased
         if exclude_items:
@@ -1,56 +1,155 @@
 # models/content_based.py
 import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix
+
+from .ann import IVFIndex, embed
+from .id_index import IdIndex
+from .ranking import top_k_desc
 
 
 class ContentBasedModel:
-    def __init__(self, text_fields, max_features=5000):
+    """TF-IDF product text model.
+
+    With `ann` params ({dim, method, n_lists, n_probe, iterations, seed}) `fit`
+    also builds an `IVFIndex` over a reduced embedding; `recommend_similar` then
+    scores only the probed clusters (re-ranked by exact TF-IDF cosine) unless
+    asked for an exact search.
+    """
+    def __init__(self, text_fields, max_features=5000, chunk_size=None, ann=None):
         self.text_fields = text_fields
         self.max_features = max_features
-        self.vectorizer = None
+        self.chunk_size = chunk_size  # stream the corpus to the vectorizer in chunks
+        self.ann = dict(ann) if ann else None
+        self._vectorizer = None
+        self._restored = None  # (terms, idf) of a restored model until its vectorizer is needed
         self.matrix = None  # TF-IDF sparse matrix
         self.product_ids = None
+        self.index = None  # IdIndex over product_ids, may be shared with the catalog
+        self.ann_index = None  # IVFIndex over the reduced embedding, if `ann` is set
 
     def _combine_text(self, products: pd.DataFrame) -> pd.Series:
-        texts = []
-        for _, row in products.iterrows():
-            parts = [str(row.get(col, "")) for col in self.text_fields]
-            texts.append(" ".join(parts))
-        return pd.Series(texts, index=products.index)
-
-    def fit(self, products: pd.DataFrame):
-        combo = self._combine_text(products)
-        self.vectorizer = TfidfVectorizer(max_features=self.max_features, stop_words="english")
-        self.matrix = self.vectorizer.fit_transform(combo)
+        """Space-joined text fields per product, built column-wise.
+
+        Each field goes through `str()` like before, so missing values become "nan"
+        (or "None") and absent columns contribute an empty string.
+        """
+        parts = [
+            products[col].map(str) if col in products else pd.Series("", index=products.index)
+            for col in self.text_fields
+        ]
+        if not parts:
+            return pd.Series("", index=products.index)
+        return parts[0].astype(object).str.cat([p.astype(object) for p in parts[1:]], sep=" ")
+
+    def _iter_text(self, products: pd.DataFrame, chunk_size: int):
+        """Stream the corpus in chunks so the full list of strings is never materialized."""
+        for start in range(0, len(products), chunk_size):
+            yield from self._combine_text(products.iloc[start:start + chunk_size])
+
+    def fit(self, products: pd.DataFrame, index=None):
+        if self.chunk_size:
+            combo = self._iter_text(products, self.chunk_size)
+        else:
+            combo = self._combine_text(products)
+        self._vectorizer = self._new_vectorizer()
+        self._restored = None
+        self.matrix = self._vectorizer.fit_transform(combo)
         self.product_ids = products["product_id"].tolist()
+        self.index = index if index is not None else IdIndex(self.product_ids)
+        self.ann_index = self._build_ann() if self.ann else None
+        return self
+
+    def _build_ann(self):
+        p = self.ann
+        embedding = embed(self.matrix, dim=p.get("dim", 128), method=p.get("method", "svd"), seed=p.get("seed", 0))
+        return IVFIndex.build(embedding, n_lists=p.get("n_lists"), n_probe=p.get("n_probe", 16),
+                              iterations=p.get("iterations", 10), seed=p.get("seed", 0))
+
+    def _new_vectorizer(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        return TfidfVectorizer(max_features=self.max_features, stop_words="english")
+
+    @property
+    def vectorizer(self):
+        """Fitted TfidfVectorizer; rebuilt on first use for restored models.
+
+        Scoring a restored model only needs the persisted matrix, so
+        scikit-learn is not imported until something transforms new text.
+        """
+        if self._vectorizer is None and self._restored is not None:
+            terms, idf = self._restored
+            self._vectorizer = self._new_vectorizer()
+            self._vectorizer.vocabulary_ = {term: i for i, term in enumerate(terms.tolist())}
+            self._vectorizer.idf_ = np.asarray(idf)
+        return self._vectorizer
+
+    def vocabulary(self):
+        """(terms in column order, idf) arrays, without building a vectorizer for restored models."""
+        if self._restored is not None:
+            return self._restored
+        vocab = self._vectorizer.vocabulary_
+        terms = np.empty(len(vocab), dtype=object)
+        for term, idx in vocab.items():
+            terms[idx] = term
+        return terms, self._vectorizer.idf_
+
+    def restore(self, product_ids, matrix, terms, idf, index=None, ann_index=None):
+        """Rebuild a fitted model from persisted arrays instead of calling `fit`."""
+        self._vectorizer = None
+        self._restored = (terms, idf)
+        self.matrix = matrix
+        self.product_ids = product_ids.tolist()
+        self.index = index if index is not None else IdIndex(product_ids)
+        self.ann_index = ann_index
         return self
 
-    def recommend_similar(self, product_id: int, top_n=10, exclude_self=True):
+    def recommend_similar(self, product_id: int, top_n=10, exclude_self=True, exact=False, n_probe=None):
+        """Most similar products by TF-IDF cosine.
+
+        Uses the ANN index when there is one (`n_probe` overrides its default
+        recall/speed setting); `exact=True` scans the whole catalog.
+        """
         if self.matrix is None:
             raise ValueError("Model not fit.")
-        try:
-            idx = self.product_ids.index(product_id)
-        except ValueError:
+        idx = self.index.position(product_id)
+        if idx < 0:
             return []
-        sims = cosine_similarity(self.matrix[idx], self.matrix).flatten()
-        order = np.argsort(-sims)
-        recs = []
-        for i in order:
-            pid = self.product_ids[i]
-            if exclude_self and pid == product_id:
-                continue
-            recs.append((pid, float(sims[i])))
-            if len(recs) >= top_n:
-                break
-        return recs
+        if self.ann_index is None or exact:
+            candidates = None
+            rows = self.matrix
+        else:
+            candidates = self.ann_index.candidates(idx, n_probe)
+            rows = self.matrix[candidates]
+        # TF-IDF rows are L2-normalized, so the sparse dot product is the cosine
+        sims = (rows @ self.matrix[idx].T).toarray().ravel()
+        ids = self.index.ids if candidates is None else self.index.ids[candidates]
+        if exclude_self:
+            sims[ids == product_id] = -np.inf
+        top = top_k_desc(sims, top_n)
+        return list(zip(ids[top].tolist(), sims[top].tolist()))
 
     def similarity_vector(self, product_ids_list):
-        idxs = [self.product_ids.index(pid) for pid in product_ids_list if pid in self.product_ids]
-        if not idxs:
+        """Mean cosine similarity of every product to the products in `product_ids_list`."""
+        idxs = self.index.positions(np.asarray(list(product_ids_list)))
+        idxs = idxs[idxs >= 0]
+        if not len(idxs):
             return np.zeros(self.matrix.shape[0])
-        sub = self.matrix[idxs]
-        sims = cosine_similarity(sub, self.matrix)  
-        mean_sims = np.asarray(sims).mean(axis=0)
-        return mean_sims
+        return self.similarity_matrix([idxs])[0]
+
+    def similarity_matrix(self, row_lists):
+        """Mean similarity to each history for a block of histories at once.
+
+        `row_lists` holds, per user, the TF-IDF row positions of the purchased
+        products (repeats count with their multiplicity, as in `similarity_vector`).
+        Rows are L2-normalized, so the mean cosine is the mean history row dotted
+        with the matrix: one (users x rows) . (rows x terms) . (terms x rows) product.
+        """
+        lengths = np.array([len(r) for r in row_lists], dtype=np.int64)
+        cols = np.concatenate([np.asarray(r, dtype=np.int64) for r in row_lists]) if lengths.sum() else np.zeros(0, dtype=np.int64)
+        rows = np.repeat(np.arange(len(row_lists)), lengths)
+        weights = 1.0 / np.repeat(np.maximum(lengths, 1), lengths)
+        history = csr_matrix((weights, (rows, cols)), shape=(len(row_lists), self.matrix.shape[0]))
+        profile = history @ self.matrix
+        return (profile @ self.matrix.T).toarray()
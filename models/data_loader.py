@@ -1,24 +1,116 @@
 # models/data_loader.py
+import hashlib
+import json
+import uuid
+
 import pandas as pd
-from sqlalchemy import text
+
+# Compact dtypes applied on load: int32 ids, float32 signals, categorical text fields.
+CUSTOMER_DTYPES = {"customer_id": "int32", "segment": "category", "location": "category"}
+PRODUCT_DTYPES = {
+    "product_id": "int32",
+    "category": "category",
+    "subcategory": "category",
+    "brand": "category",
+    "price": "float32",
+}
+TRANSACTION_DTYPES = {
+    "customer_id": "int32",
+    "product_id": "int32",
+    "quantity": "float32",
+    "unit_price": "float32",
+    "rating": "float32",
+}
+
+
+# Change counter behind the fingerprint. Triggers bump it on every write to products
+# and on transaction updates and deletes; appended transactions already move the
+# transactions COUNT / MAX, and a per-row insert trigger would slow bulk loads.
+# `epoch` is random per creation, so a recreated database never matches an old one.
+DATA_VERSION_TABLE = "data_version"
+VERSIONED_WRITES = [("products", "INSERT"), ("products", "UPDATE"), ("products", "DELETE"),
+                    ("transactions", "UPDATE"), ("transactions", "DELETE")]
+_DATA_VERSION_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} (
+        id INTEGER PRIMARY KEY,
+        epoch TEXT NOT NULL,
+        version INTEGER NOT NULL
+    )
+"""
+_BUMP = f"UPDATE {DATA_VERSION_TABLE} SET version = version + 1 WHERE id = 1"
+
+
+def _version_trigger_ddl(dialect):
+    """Statements (re)creating the data_version triggers, or None when `dialect` has none here."""
+    names = [(f"{DATA_VERSION_TABLE}_{table}_{event.lower()}", table, event) for table, event in VERSIONED_WRITES]
+    if dialect == "sqlite":
+        return [f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} BEGIN {_BUMP}; END"
+                for name, table, event in names]
+    if dialect == "postgresql":
+        ddl = [f"CREATE OR REPLACE FUNCTION bump_{DATA_VERSION_TABLE}() RETURNS trigger LANGUAGE plpgsql "
+               f"AS $$ BEGIN {_BUMP}; RETURN NULL; END $$"]
+        for name, table, event in names:  # statement-level: one bump per COPY / bulk statement
+            ddl.append(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+            ddl.append(f"CREATE TRIGGER {name} AFTER {event} ON {table} "
+                       f"FOR EACH STATEMENT EXECUTE FUNCTION bump_{DATA_VERSION_TABLE}()")
+        return ddl
+    return None
+
+
+def _select(table, columns=None):
+    if columns is None:
+        return f"SELECT * FROM {table}"
+    for col in columns:
+        if not col.isidentifier():
+            raise ValueError(f"Invalid column name: {col!r}")
+    return f"SELECT {', '.join(columns)} FROM {table}"
+
+
+def _typed(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    return df.astype({c: t for c, t in dtypes.items() if c in df})
 
 
 class DataLoader:
-    """Centralized data access from SQL DB into DataFrames."""
+    """Centralized data access from SQL DB into DataFrames.
+
+    Every table reader accepts a `columns` projection; `transactions` can also
+    stream the table as an iterator of `chunksize`-row frames.
+    """
     def __init__(self, engine):
         self.engine = engine
 
-    def customers(self) -> pd.DataFrame:
-        return pd.read_sql("SELECT * FROM customers", self.engine)
+    def customers(self, columns=None) -> pd.DataFrame:
+        return _typed(pd.read_sql(_select("customers", columns), self.engine), CUSTOMER_DTYPES)
 
-    def products(self) -> pd.DataFrame:
-        return pd.read_sql("SELECT * FROM products", self.engine)
+    def products(self, columns=None) -> pd.DataFrame:
+        return _typed(pd.read_sql(_select("products", columns), self.engine), PRODUCT_DTYPES)
 
-    def transactions(self) -> pd.DataFrame:
-        df = pd.read_sql("SELECT * FROM transactions", self.engine, parse_dates=["purchase_timestamp"])
-        return df
+    def transactions(self, columns=None, chunksize=None):
+        parse_dates = ["purchase_timestamp"] if columns is None or "purchase_timestamp" in columns else None
+        sql = _select("transactions", columns)
+        if chunksize:
+            chunks = pd.read_sql(sql, self.engine, parse_dates=parse_dates, chunksize=chunksize)
+            return (_typed(chunk, TRANSACTION_DTYPES) for chunk in chunks)
+        df = pd.read_sql(sql, self.engine, parse_dates=parse_dates)
+        return _typed(df, TRANSACTION_DTYPES)
+
+    def transactions_since(self, last_transaction_id) -> pd.DataFrame:
+        """Transactions with a transaction_id above `last_transaction_id` (all if None), in id order.
+
+        The id is the high-water mark rather than purchase_timestamp, which is
+        stored as text (format-dependent comparisons) and is not unique.
+        """
+        if last_transaction_id is None:
+            return self.transactions()
+        from sqlalchemy import text
+
+        q = text("SELECT * FROM transactions WHERE transaction_id > :last ORDER BY transaction_id")
+        df = pd.read_sql(q, self.engine, params={"last": int(last_transaction_id)}, parse_dates=["purchase_timestamp"])
+        return _typed(df, TRANSACTION_DTYPES)
 
     def user_history(self, customer_id: int) -> pd.DataFrame:
+        from sqlalchemy import text
+
         q = text(
             """
             SELECT t.*, p.product_name, p.category, p.subcategory, p.brand, p.price
@@ -29,3 +121,50 @@ class DataLoader:
             """
         )
         return pd.read_sql(q, self.engine, params={"cid": customer_id}, parse_dates=["purchase_timestamp"])
+
+    def fingerprint(self) -> str:
+        """Cheap fingerprint of the source tables, used to detect stale model artifacts.
+
+        Row counts and high-water marks plus the data_version counter, so it costs
+        a few index lookups rather than a scan. Without the counter (a read-only
+        engine on a database no writer has fingerprinted yet) the product rows
+        are hashed instead.
+        """
+        from sqlalchemy import text
+
+        stats = {}
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT COUNT(*), MAX(transaction_id), MAX(purchase_timestamp) FROM transactions"
+            )).one()
+            stats["transactions"] = [str(v) for v in row]
+            row = conn.execute(text("SELECT COUNT(*), MAX(product_id) FROM products")).one()
+            stats["products"] = [str(v) for v in row]
+        version = self.data_version()
+        stats["data_version"] = list(version) if version is not None else ["rows", self._products_hash()]
+        payload = json.dumps(stats, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(payload).hexdigest()
+
+    def data_version(self):
+        """(epoch, version) of the change counter, installing it on first use; None if it cannot be."""
+        from sqlalchemy import inspect, text
+
+        if not inspect(self.engine).has_table(DATA_VERSION_TABLE):
+            ddl = _version_trigger_ddl(self.engine.dialect.name)
+            if ddl is None or self.engine.url.query.get("mode") == "ro":
+                return None
+            with self.engine.begin() as conn:
+                conn.execute(text(_DATA_VERSION_DDL))
+                conn.execute(text(
+                    f"INSERT INTO {DATA_VERSION_TABLE} (id, epoch, version) SELECT 1, :epoch, 0 "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM {DATA_VERSION_TABLE} WHERE id = 1)"
+                ), {"epoch": uuid.uuid4().hex})
+                for statement in ddl:
+                    conn.execute(text(statement))
+        with self.engine.connect() as conn:
+            row = conn.execute(text(f"SELECT epoch, version FROM {DATA_VERSION_TABLE} WHERE id = 1")).one_or_none()
+        return None if row is None else (row[0], int(row[1]))
+
+    def _products_hash(self) -> str:
+        rows = pd.read_sql("SELECT * FROM products ORDER BY product_id", self.engine)
+        return hashlib.sha1(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes()).hexdigest()
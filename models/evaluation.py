@@ -0,0 +1,100 @@
+# models/evaluation.py
+"""Offline evaluation: temporal train/test split, batch scoring and a weight grid sweep."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .hybrid_model import HybridRecommender
+from .metrics import (
+    average_precision_at_k_matrix,
+    catalog_coverage,
+    hit_matrix,
+    ndcg_at_k_matrix,
+    precision_at_k_matrix,
+    recall_at_k_matrix,
+)
+
+
+def temporal_split(transactions: pd.DataFrame, test_fraction=0.2, cutoff=None):
+    """Split on purchase_timestamp: everything after `cutoff` (default: the
+    1 - test_fraction quantile) is test, the rest is train."""
+    ts = transactions["purchase_timestamp"]
+    if cutoff is None:
+        cutoff = ts.quantile(1.0 - test_fraction)
+    cutoff = pd.Timestamp(cutoff)
+    return transactions[ts <= cutoff], transactions[ts > cutoff], cutoff
+
+
+def relevant_items(train: pd.DataFrame, test: pd.DataFrame):
+    """Per test customer, the products bought in test that they had not bought in train."""
+    cols = ["customer_id", "product_id"]
+    merged = test[cols].drop_duplicates().merge(train[cols].drop_duplicates(), how="left", indicator=True)
+    new = merged[merged["_merge"] == "left_only"]
+    return new.groupby("customer_id")["product_id"].apply(list).to_dict()
+
+
+def rank_matrix(rec_lists, k):
+    """users x k matrix of recommended product ids, padded with -1."""
+    out = np.full((len(rec_lists), k), -1, dtype=np.int64)
+    for r, recs in enumerate(rec_lists):
+        ids = [pid for pid, _ in recs[:k]]
+        out[r, :len(ids)] = ids
+    return out
+
+
+def score_weights(recsys, weights, customer_ids, actual_lists, k, block_size):
+    """Metrics for one weight setting, reusing the fitted base models of `recsys`."""
+    hybrid = HybridRecommender(
+        recsys.collab_model, recsys.content_model, recsys.hybrid_model.popularity, weights,
+        item_index=recsys.catalog.index,
+    )
+    purchased = recsys.history_index.get_many(customer_ids)
+    recs = hybrid.recommend_batch(customer_ids, purchased, top_n=k, block_size=block_size)
+    ids = rank_matrix(recs, k)
+    hits = hit_matrix(ids, actual_lists)
+    n_rel = np.array([len(a) for a in actual_lists])
+    return {
+        "weights": dict(weights),
+        "users": len(customer_ids),
+        f"precision@{k}": float(precision_at_k_matrix(ids, hits, k).mean()),
+        f"recall@{k}": float(recall_at_k_matrix(hits, n_rel, k).mean()),
+        f"ndcg@{k}": float(ndcg_at_k_matrix(hits, n_rel, k).mean()),
+        f"map@{k}": float(average_precision_at_k_matrix(hits, n_rel, k).mean()),
+        f"coverage@{k}": float(catalog_coverage(ids, len(recsys.catalog), k)),
+    }
+
+
+def evaluate(recsys, products: pd.DataFrame, transactions: pd.DataFrame, weight_grid=None, k=10,
+             test_fraction=0.2, cutoff=None, workers=1, block_size=512):
+    """Fit `recsys` on the train part and score every test user for each weight setting.
+
+    The base models are fitted once; each grid point only builds a new
+    HybridRecommender on top of them. Grid points run in a thread pool (the heavy
+    lifting is NumPy/SciPy, which releases the GIL).
+    """
+    train, test, cutoff = temporal_split(transactions, test_fraction, cutoff)
+    recsys.products_df = products
+    recsys.transactions_df = train
+    recsys.interactions = None
+    recsys.catalog = None
+    recsys.history_index = None
+    recsys.aggregates = None  # popularity from the train split only
+    recsys.build_models()
+
+    actual = relevant_items(train, test)
+    customer_ids = sorted(actual)
+    actual_lists = [actual[c] for c in customer_ids]
+    grid = weight_grid or [recsys.hybrid_model.w]
+
+    def run(weights):
+        return score_weights(recsys, weights, customer_ids, actual_lists, k, block_size)
+
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        results = list(pool.map(run, grid))
+    return {
+        "cutoff": str(cutoff),
+        "train_transactions": len(train),
+        "test_transactions": len(test),
+        "results": results,
+    }
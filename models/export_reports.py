@@ -16,3 +16,133 @@ def export_excel(customers_df, products_df, transactions_df, recommendations_dic
                 sheet = f"c{cid}"
             df.to_excel(writer, sheet_name=sheet, index=False)
     return outpath
+
+
+EXCEL_MAX_ROWS = 1_048_576
+
+# Columns of the long recommendation table (recommend_batch) and their types;
+# the decoration columns present depend on the products table.
+EXPORT_COLUMN_TYPES = {
+    "customer_id": "int64",
+    "rank": "int64",
+    "product_id": "int64",
+    "score": "float64",
+    "product_name": "string",
+    "category": "string",
+    "subcategory": "string",
+    "brand": "string",
+    "price": "float64",
+}
+
+
+class _CsvSink:
+    def __init__(self, outpath, columns=None):
+        self.outpath = outpath
+        self.columns = columns
+        self._header = True
+
+    def write(self, df):
+        df.to_csv(self.outpath, mode="w" if self._header else "a", header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        if self._header:  # nothing written: still produce a file
+            pd.DataFrame(columns=self.columns or []).to_csv(self.outpath, index=False)
+
+
+class _ParquetSink:
+    """ParquetWriter with a schema fixed up front from EXPORT_COLUMN_TYPES.
+
+    Inferring it from the first batch would type a column that is all null
+    there (customers without recommendations) as `null`, and every later
+    batch with values in it would fail to write.
+    """
+    def __init__(self, outpath, columns=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow).") from exc
+        self._pa = pa
+        self.outpath = outpath
+        self._schema = pa.schema([
+            (name, getattr(pa, EXPORT_COLUMN_TYPES.get(name, "string"))())
+            for name in (columns or list(EXPORT_COLUMN_TYPES))
+        ])
+        self._writer = pq.ParquetWriter(outpath, self._schema)
+
+    def write(self, df):
+        table = self._pa.Table.from_pandas(df[self._schema.names], schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+
+class _ExcelSink:
+    """openpyxl write-only workbook: rows are flushed as they are appended."""
+    def __init__(self, outpath, columns=None, sheet="recommendations"):
+        from openpyxl import Workbook
+
+        self.outpath = outpath
+        self.sheet = sheet
+        self._wb = Workbook(write_only=True)
+        self._ws = None
+        self._rows = 0
+        self._sheets = 0
+        self._columns = columns
+
+    def _new_sheet(self):
+        self._sheets += 1
+        title = self.sheet if self._sheets == 1 else f"{self.sheet}_{self._sheets}"
+        self._ws = self._wb.create_sheet(title)
+        self._ws.append(self._columns)
+        self._rows = 1
+
+    def write(self, df):
+        if self._ws is None:
+            self._columns = self._columns or list(df.columns)
+            self._new_sheet()
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self._rows >= EXCEL_MAX_ROWS:
+                self._new_sheet()
+            self._ws.append(row)
+            self._rows += 1
+
+    def close(self):
+        if self._ws is None:
+            if self._columns:
+                self._new_sheet()
+            else:
+                self._wb.create_sheet(self.sheet)
+        self._wb.save(self.outpath)
+
+
+SINKS = {"csv": _CsvSink, "parquet": _ParquetSink, "xlsx": _ExcelSink}
+
+
+def infer_format(outpath):
+    suffix = str(outpath).rsplit(".", 1)[-1].lower()
+    return {"xls": "xlsx", "xlsx": "xlsx", "csv": "csv", "parquet": "parquet", "pq": "parquet"}.get(suffix, "csv")
+
+
+def export_stream(batches, outpath, fmt=None, columns=None):
+    """Write recommendation batches as one long table (customer_id, rank, product_id, score, ...).
+
+    `batches` is any iterable of DataFrames with identical columns; each is written
+    as soon as it arrives, so memory does not grow with the number of customers.
+    `columns` (default: every EXPORT_COLUMN_TYPES column) fixes the output
+    columns up front, so an export with no rows still gets its header / schema.
+    Returns the number of rows written.
+    """
+    sink = SINKS[fmt or infer_format(outpath)](outpath, columns=columns)
+    rows = 0
+    try:
+        for df in batches:
+            if len(df):
+                sink.write(df)
+                rows += len(df)
+    finally:
+        sink.close()
+    return rows
@@ -0,0 +1,61 @@
+# models/history_index.py
+import numpy as np
+import pandas as pd
+
+
+class PurchaseHistoryIndex:
+    """In-memory per-customer purchase history.
+
+    Stored CSR-style: `customer_ids` is sorted, and the purchases of
+    `customer_ids[i]` are `product_ids[offsets[i]:offsets[i + 1]]` (sorted, one
+    entry per transaction, so repeat purchases keep their multiplicity).
+    """
+    def __init__(self, customer_ids, offsets, product_ids):
+        self.customer_ids = np.asarray(customer_ids)
+        self.offsets = np.asarray(offsets)
+        self.product_ids = np.asarray(product_ids)
+
+    @classmethod
+    def from_transactions(cls, transactions: pd.DataFrame):
+        cust = transactions["customer_id"].to_numpy()
+        prod = transactions["product_id"].to_numpy()
+        order = np.lexsort((prod, cust))
+        cust, prod = cust[order], prod[order]
+        customer_ids, counts = np.unique(cust, return_counts=True)
+        offsets = np.zeros(len(customer_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(customer_ids, offsets, prod)
+
+    def append(self, transactions: pd.DataFrame):
+        """New index with the purchases in `transactions` merged in."""
+        old = pd.DataFrame({
+            "customer_id": np.repeat(self.customer_ids, np.diff(self.offsets)),
+            "product_id": self.product_ids,
+        })
+        return PurchaseHistoryIndex.from_transactions(
+            pd.concat([old, transactions[["customer_id", "product_id"]]], ignore_index=True)
+        )
+
+    def __len__(self):
+        return len(self.customer_ids)
+
+    def __contains__(self, customer_id):
+        return self._row(customer_id) >= 0
+
+    def _row(self, customer_id) -> int:
+        if len(self.customer_ids) == 0:
+            return -1
+        i = int(np.searchsorted(self.customer_ids, customer_id))
+        if i < len(self.customer_ids) and self.customer_ids[i] == customer_id:
+            return i
+        return -1
+
+    def get(self, customer_id) -> np.ndarray:
+        """Product ids purchased by `customer_id` (empty if unknown)."""
+        i = self._row(customer_id)
+        if i < 0:
+            return self.product_ids[:0]
+        return self.product_ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def get_many(self, customer_ids):
+        return [self.get(cid) for cid in customer_ids]
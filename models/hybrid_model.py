@@ -1,47 +1,167 @@
 import numpy as np
 import pandas as pd
 
+from .id_index import IdIndex
+from .instrumentation import metrics
+from .ranking import top_k_desc, top_k_rows
+
+
+def _flat_positions(id_lists, index_of):
+    """(row, position) pairs for every id of every list that `index_of` knows."""
+    rows, cols = [], []
+    for r, ids in enumerate(id_lists):
+        for pid in ids:
+            pos = index_of(pid)
+            if pos >= 0:
+                rows.append(r)
+                cols.append(pos)
+    return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
 
 class HybridRecommender:
-    """Blend collaborative, content, and popularity scores."""
-    def __init__(self, collab_model, content_model, popularity_series, weights=None):
+    """Blend collaborative, content, and popularity scores.
+
+    All three signals live on one shared item index (`self.index`), so blending is
+    a weighted sum of aligned arrays and top-N selection is an `argpartition`.
+    """
+    def __init__(self, collab_model, content_model, popularity_series, weights=None, collab_candidates=100,
+                 item_index=None):
         if weights is None:
             weights = {"collaborative": 0.6, "content": 0.3, "popularity": 0.1}
         self.w = weights
         self.collab = collab_model
         self.content = content_model
         self.popularity = popularity_series  # pd.Series indexed by product_id
+        self.collab_candidates = collab_candidates
+        self._align(item_index)
 
-    def recommend(self, customer_id: int, purchased_ids, top_n=10):
-        # Collaborative scores
-        collab_scores = {}
-        if self.collab is not None:
-            for pid, score in self.collab.recommend_for_user(customer_id, top_n=100, exclude_items=purchased_ids):
-                collab_scores[pid] = score
-
-        # Content scores
-        content_scores = {}
-        if self.content is not None and purchased_ids:
-            sims = self.content.similarity_vector(purchased_ids)
-            for pid, score in zip(self.content.product_ids, sims):
-                if pid in purchased_ids:
-                    continue
-                content_scores[pid] = float(score)
+    def _align(self, item_index=None):
+        """Map every signal onto the shared item index and precompute popularity.
+
+        The index defaults to the content model's (i.e. the catalog's); ids that only
+        appear in transactions are appended to a private copy.
+        """
+        content_ids = np.asarray(self.content.product_ids) if self.content is not None else None
+        collab_ids = None
+        if self.collab is not None and self.collab.matrix is not None:
+            collab_ids = np.array([self.collab.index_item[i] for i in range(len(self.collab.index_item))])
+        if item_index is None and self.content is not None:
+            item_index = self.content.index
+        ids = [a for a in (content_ids, collab_ids, self.popularity.index.to_numpy()) if a is not None and len(a)]
+        all_ids = pd.unique(np.concatenate(ids)) if ids else np.zeros(0, dtype=np.int64)
+        if item_index is not None and (item_index.positions(all_ids) >= 0).all():
+            self.index = item_index
+        else:
+            base = [item_index.ids] if item_index is not None and len(item_index) else []
+            self.index = IdIndex(pd.unique(np.concatenate(base + [all_ids])))
+        self._content_pos = self.index.positions(content_ids) if content_ids is not None else None
+        self._content_row = np.full(len(self.index), -1, dtype=np.int64)  # shared position -> TF-IDF row
+        if self._content_pos is not None:
+            self._content_row[self._content_pos] = np.arange(len(self._content_pos))
+        self._collab_pos = self.index.positions(collab_ids) if collab_ids is not None else None
 
         # Popularity normalized 0..1
-        pop = self.popularity.copy()
+        pop = self.popularity
         if len(pop) > 0:
             pop = (pop - pop.min()) / (pop.max() - pop.min() + 1e-9)
-        pop_scores = pop.to_dict()
-
-        # Combine
-        all_ids = set(collab_scores) | set(content_scores) | set(pop_scores)
-        combined = []
-        for pid in all_ids:
-            c = collab_scores.get(pid, 0.0)
-            t = content_scores.get(pid, 0.0)
-            p = pop_scores.get(pid, 0.0)
-            score = self.w["collaborative"] * c + self.w["content"] * t + self.w["popularity"] * p
-            combined.append((pid, float(score)))
-        combined.sort(key=lambda x: x[1], reverse=True)
-        return combined[:top_n]
+        self._pop_scores = np.zeros(len(self.index))
+        self._pop_present = np.zeros(len(self.index), dtype=bool)
+        pop_pos = self.index.positions(pop.index.to_numpy())
+        self._pop_scores[pop_pos] = pop.to_numpy(dtype=float)
+        self._pop_present[pop_pos] = True
+
+    def refresh(self, popularity_series=None):
+        """Re-align the signals after the underlying models or popularity changed."""
+        if popularity_series is not None:
+            self.popularity = popularity_series
+        self._align(self.index)
+
+    def recommend(self, customer_id: int, purchased_ids, top_n=10):
+        purchased = np.asarray(list(purchased_ids) if purchased_ids is not None else [])
+        scores = self.w["popularity"] * self._pop_scores
+        candidate = self._pop_present.copy()
+
+        # Collaborative scores: the best `collab_candidates` unpurchased items
+        if self._collab_pos is not None:
+            with metrics.timer("score.collaborative"):
+                collab = self.collab.score_user(customer_id)
+            if collab is not None:
+                owned = [self.collab.item_index[pid] for pid in purchased.tolist() if pid in self.collab.item_index]
+                collab[owned] = -np.inf
+                top = top_k_desc(collab, self.collab_candidates)
+                scores[self._collab_pos[top]] += self.w["collaborative"] * collab[top]
+                candidate[self._collab_pos[top]] = True
+
+        # Content scores for every unpurchased catalog item
+        if self._content_pos is not None and purchased.size:
+            with metrics.timer("score.content"):
+                sims = np.asarray(self.content.similarity_vector(purchased.tolist()), dtype=float)
+            keep = ~np.isin(self.index.ids[self._content_pos], purchased)
+            pos = self._content_pos[keep]
+            scores[pos] += self.w["content"] * sims[keep]
+            candidate[pos] = True
+
+        scores[~candidate] = -np.inf
+        top = top_k_desc(scores, top_n)
+        return list(zip(self.index.ids[top].tolist(), scores[top].tolist()))
+
+    def _content_rows(self, product_ids) -> np.ndarray:
+        """TF-IDF row positions of `product_ids`, skipping ids outside the catalog."""
+        pos = self.index.positions(np.asarray(list(product_ids)))
+        rows = self._content_row[pos[pos >= 0]]
+        return rows[rows >= 0]
+
+    def recommend_batch(self, customer_ids, purchased_lists, top_n=10, block_size=512):
+        """`recommend` for many customers, scoring `block_size` customers per matrix product.
+
+        Returns one list of (product_id, score) per customer, in input order.
+        """
+        results = []
+        for start in range(0, len(customer_ids), block_size):
+            block_ids = list(customer_ids[start:start + block_size])
+            block_hist = [list(h) if h is not None else [] for h in purchased_lists[start:start + block_size]]
+            results.extend(self._recommend_block(block_ids, block_hist, top_n))
+        return results
+
+    def _recommend_block(self, customer_ids, purchased_lists, top_n):
+        n_users, n_items = len(customer_ids), len(self.index)
+        scores = np.tile(self.w["popularity"] * self._pop_scores, (n_users, 1))
+        candidate = np.tile(self._pop_present, (n_users, 1))
+
+        # Collaborative: best `collab_candidates` unpurchased items per known user
+        if self._collab_pos is not None:
+            with metrics.timer("score.collaborative"):
+                known, collab = self.collab.score_users(customer_ids)
+            rows, cols = _flat_positions(purchased_lists, lambda pid: self.collab.item_index.get(pid, -1))
+            collab[rows, cols] = -np.inf
+            collab[~known] = -np.inf
+            top = top_k_rows(collab, self.collab_candidates)
+            vals = np.take_along_axis(collab, top, axis=1)
+            ok = np.isfinite(vals)
+            r = np.broadcast_to(np.arange(n_users)[:, None], top.shape)[ok]
+            pos = self._collab_pos[top[ok]]
+            scores[r, pos] += self.w["collaborative"] * vals[ok]
+            candidate[r, pos] = True
+
+        # Content: mean TF-IDF similarity to each non-empty history
+        if self._content_pos is not None:
+            sub = np.flatnonzero([len(h) > 0 for h in purchased_lists])
+            if len(sub):
+                hist_rows = [self._content_rows(purchased_lists[i]) for i in sub]
+                with metrics.timer("score.content"):
+                    sims = self.content.similarity_matrix(hist_rows)
+                keep = np.ones_like(sims, dtype=bool)
+                keep[np.repeat(np.arange(len(sub)), [len(h) for h in hist_rows]), np.concatenate(hist_rows)] = False
+                block = np.ix_(sub, self._content_pos)
+                scores[block] += self.w["content"] * np.where(keep, sims, 0.0)
+                candidate[block] |= keep
+
+        scores[~candidate] = -np.inf
+        top = top_k_rows(scores, top_n)
+        vals = np.take_along_axis(scores, top, axis=1)
+        ids = self.index.ids[top]
+        out = []
+        for r in range(n_users):
+            ok = np.isfinite(vals[r])
+            out.append(list(zip(ids[r][ok].tolist(), vals[r][ok].tolist())))
+        return out
@@ -0,0 +1,33 @@
+# models/id_index.py
+import numpy as np
+
+
+class IdIndex:
+    """Array-backed id <-> position map shared by the models.
+
+    Lookups go through a sorted copy of the ids with `np.searchsorted`, so mapping
+    a whole batch of ids costs one vectorized call instead of a Python loop.
+    """
+    def __init__(self, ids):
+        self.ids = np.asarray(ids)
+        self._order = np.argsort(self.ids, kind="stable")
+        self._sorted = self.ids[self._order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, item_id):
+        return self.position(item_id) >= 0
+
+    def positions(self, item_ids) -> np.ndarray:
+        """Positions of `item_ids`, with -1 for ids that are not indexed."""
+        keys = np.asarray(item_ids)
+        if keys.size == 0 or len(self.ids) == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        loc = np.searchsorted(self._sorted, keys)
+        loc = np.minimum(loc, len(self._sorted) - 1)
+        found = self._sorted[loc] == keys
+        return np.where(found, self._order[loc], -1).astype(np.int64)
+
+    def position(self, item_id) -> int:
+        return int(self.positions([item_id])[0])
@@ -1 +0,0 @@
-from .recommender import RecommenderSystem
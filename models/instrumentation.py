@@ -0,0 +1,239 @@
+# models/instrumentation.py
+"""In-process timers, counters and gauges for the recommender pipeline.
+
+`metrics` is the process-wide registry. Stages are timed with
+`metrics.timer("recommend.hybrid")` into fixed-bucket histograms, so recording
+costs a lock and a bisect. The registry renders itself as Prometheus text
+(`to_prometheus`) or a JSON-friendly summary with bucket-estimated quantiles
+(`summary`). Worker processes ship their measurements back with `drain` and
+the parent folds them in with `merge`.
+"""
+import bisect
+import contextlib
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Upper bounds in seconds; the last bucket is +Inf.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where unsupported."""
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, capped at the observed max."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def state(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "count": self.count, "sum": self.sum,
+                "max": self.max}
+
+    def merge(self, state):
+        if tuple(state["buckets"]) != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets.")
+        self.counts = [a + b for a, b in zip(self.counts, state["counts"])]
+        self.count += state["count"]
+        self.sum += state["sum"]
+        self.max = max(self.max, state["max"])
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _flat_name(name, labels):
+    if name == "stage_seconds" and len(labels) == 1:
+        return labels[0][1]  # timers are listed by stage
+    return name + "".join(f"[{v}]" for _, v in labels)
+
+
+class MetricsRegistry:
+    """Histograms (timers), counters and gauges keyed by name and labels."""
+    def __init__(self, prefix="recsys", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    # ---------- Recording ----------
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Time the block into the `stage_seconds{stage=...}` histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def inc(self, name, n=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def snapshot_memory(self, stage):
+        """Record the process peak RSS after `stage` as `peak_rss_bytes{stage=...}`."""
+        peak = peak_rss_bytes()
+        if peak is not None:
+            self.set_gauge("peak_rss_bytes", peak, stage=stage)
+
+    # ---------- Transfer ----------
+    def drain(self):
+        """Picklable state of everything recorded so far; the registry is reset."""
+        with self._lock:
+            state = {
+                "histograms": [(k, h.state()) for k, h in self._histograms.items()],
+                "counters": list(self._counters.items()),
+                "gauges": list(self._gauges.items()),
+            }
+            self._histograms, self._counters, self._gauges = {}, {}, {}
+        return state
+
+    def merge(self, state):
+        """Fold a `drain` result (e.g. from a worker process) into this registry."""
+        with self._lock:
+            for key, hist_state in state["histograms"]:
+                key = (key[0], tuple(tuple(p) for p in key[1]))
+                hist = self._histograms.get(key)
+                if hist is None:
+                    hist = self._histograms[key] = Histogram(hist_state["buckets"])
+                hist.merge(hist_state)
+            for key, n in state["counters"]:
+                key = (key[0], tuple(tuple(p) for p in key[1]))
+                self._counters[key] = self._counters.get(key, 0) + n
+            for key, value in state["gauges"]:
+                key = (key[0], tuple(tuple(p) for p in key[1]))
+                self._gauges[key] = max(value, self._gauges.get(key, value))
+
+    def reset(self):
+        self.drain()
+
+    def _after_fork(self):
+        # the lock may have been held by another thread of the parent at fork time
+        self._lock = threading.Lock()
+        self._histograms, self._counters, self._gauges = {}, {}, {}
+
+    # ---------- Export ----------
+    def summary(self):
+        """{"timers": ..., "counters": ..., "gauges": ...}; timer values are in milliseconds."""
+        with self._lock:
+            timers = {
+                _flat_name(name, labels): {
+                    "count": h.count,
+                    "total_ms": round(1000.0 * h.sum, 3),
+                    "mean_ms": round(1000.0 * h.sum / h.count, 3) if h.count else 0.0,
+                    "p50_ms": round(1000.0 * h.quantile(0.50), 3),
+                    "p95_ms": round(1000.0 * h.quantile(0.95), 3),
+                    "p99_ms": round(1000.0 * h.quantile(0.99), 3),
+                    "max_ms": round(1000.0 * h.max, 3),
+                }
+                for (name, labels), h in sorted(self._histograms.items())
+            }
+            counters = {_flat_name(name, labels): n for (name, labels), n in sorted(self._counters.items())}
+            gauges = {_flat_name(name, labels): v for (name, labels), v in sorted(self._gauges.items())}
+        return {"timers": timers, "counters": counters, "gauges": gauges}
+
+    def to_prometheus(self, extra_gauges=None):
+        """Prometheus text exposition format (version 0.0.4).
+
+        `extra_gauges` maps name -> {label tuple: value} for values sampled at
+        scrape time (e.g. database pool state).
+        """
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+        families = {}  # one TYPE line per metric family
+        for (name, labels), h in histograms:
+            families.setdefault(("histogram", name), []).append((labels, h))
+        for (name, labels), n in counters:
+            families.setdefault(("counter", name), []).append((labels, n))
+        for (name, labels), v in gauges:
+            families.setdefault(("gauge", name), []).append((labels, v))
+        for name, vals in (extra_gauges or {}).items():
+            for labels, v in vals.items():
+                families.setdefault(("gauge", name), []).append((tuple(labels), v))
+
+        for (kind, name), samples in families.items():
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, value in samples:
+                if kind == "histogram":
+                    cumulative = 0
+                    for bound, n in zip(value.buckets + (float("inf"),), value.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{full}_bucket{_label_text(labels, [('le', le)])} {cumulative}")
+                    lines.append(f"{full}_sum{_label_text(labels)} {value.sum!r}")
+                    lines.append(f"{full}_count{_label_text(labels)} {value.count}")
+                else:
+                    lines.append(f"{full}{_label_text(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+if hasattr(os, "register_at_fork"):
+    # a forked worker must not report the parent's measurements again
+    os.register_at_fork(after_in_child=metrics._after_fork)
@@ -0,0 +1,79 @@
+# models/interactions.py
+import numpy as np
+import pandas as pd
+
+INTERACTION_COLUMNS = ["transaction_id", "customer_id", "product_id", "quantity", "rating", "purchase_timestamp"]
+
+
+class Interactions:
+    """Compact column arrays of the transaction fields the models train on."""
+    def __init__(self, customer_ids, product_ids, quantity, rating, watermark=None, last_transaction_id=None):
+        self.customer_ids = customer_ids  # int32
+        self.product_ids = product_ids  # int32
+        self.quantity = quantity  # float32, NaN when missing
+        self.rating = rating  # float32, NaN when missing
+        self.watermark = watermark  # latest purchase_timestamp
+        self.last_transaction_id = last_transaction_id  # highest transaction_id
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        builder = InteractionBuilder()
+        builder.add(df)
+        return builder.finish()
+
+    def append(self, df: pd.DataFrame):
+        """New `Interactions` with the rows of `df` added."""
+        more = Interactions.from_frame(df)
+        marks = [m for m in (self.watermark, more.watermark) if m is not None]
+        ids = [i for i in (self.last_transaction_id, more.last_transaction_id) if i is not None]
+        return Interactions(
+            np.concatenate([self.customer_ids, more.customer_ids]),
+            np.concatenate([self.product_ids, more.product_ids]),
+            np.concatenate([self.quantity, more.quantity]),
+            np.concatenate([self.rating, more.rating]),
+            watermark=max(marks) if marks else None,
+            last_transaction_id=max(ids) if ids else None,
+        )
+
+    def __len__(self):
+        return len(self.customer_ids)
+
+    def popularity(self) -> pd.Series:
+        """Total quantity per product_id, most popular first."""
+        pop = pd.Series(self.quantity, index=pd.Index(self.product_ids, name="product_id"), name="quantity")
+        return pop.groupby(level=0).sum().astype(float).sort_values(ascending=False)
+
+
+class InteractionBuilder:
+    """Accumulates transaction chunks into `Interactions` without keeping the frames."""
+    def __init__(self):
+        self._parts = {"customer_ids": [], "product_ids": [], "quantity": [], "rating": []}
+        self._watermark = None
+        self._last_id = None
+
+    def add(self, chunk: pd.DataFrame):
+        n = len(chunk)
+        self._parts["customer_ids"].append(chunk["customer_id"].to_numpy(dtype=np.int32))
+        self._parts["product_ids"].append(chunk["product_id"].to_numpy(dtype=np.int32))
+        for col, key in (("quantity", "quantity"), ("rating", "rating")):
+            if col in chunk:
+                values = chunk[col].to_numpy(dtype=np.float32, na_value=np.nan)
+            else:
+                values = np.full(n, np.nan, dtype=np.float32)
+            self._parts[key].append(values)
+        if "purchase_timestamp" in chunk and n:
+            latest = chunk["purchase_timestamp"].max()
+            if pd.notna(latest) and (self._watermark is None or latest > self._watermark):
+                self._watermark = latest
+        if "transaction_id" in chunk and n:
+            last = int(chunk["transaction_id"].max())
+            if self._last_id is None or last > self._last_id:
+                self._last_id = last
+        return self
+
+    def finish(self) -> Interactions:
+        arrays = {}
+        for key, parts in self._parts.items():
+            dtype = np.int32 if key.endswith("_ids") else np.float32
+            arrays[key] = np.concatenate(parts).astype(dtype, copy=False) if parts else np.zeros(0, dtype=dtype)
+        return Interactions(watermark=self._watermark, last_transaction_id=self._last_id, **arrays)
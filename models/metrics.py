@@ -18,3 +18,55 @@ def recall_at_k(recommended, actual, k=10):
         return 0.0
     hits = sum(1 for r in recs if r in actual_set)
     return hits / len(actual_set)
+
+
+# ---------- Vectorized metrics over rank matrices ----------
+# `rec_ids` is a users x k matrix of recommended item ids, best first, padded with
+# -1 where a user got fewer than k recommendations. `actual` holds each user's
+# relevant item ids. All functions return one value per user unless noted.
+
+def hit_matrix(rec_ids: np.ndarray, actual) -> np.ndarray:
+    """Boolean users x k matrix: is the item at each rank relevant for that user?"""
+    n_users = rec_ids.shape[0]
+    lengths = np.array([len(a) for a in actual], dtype=np.int64)
+    rel_users = np.repeat(np.arange(n_users), lengths)
+    rel_items = np.concatenate([np.asarray(a, dtype=np.int64) for a in actual]) if lengths.sum() else np.zeros(0, dtype=np.int64)
+    width = int(max(rec_ids.max(initial=0), rel_items.max(initial=0))) + 1
+    rec_keys = np.arange(n_users)[:, None] * width + rec_ids
+    hits = np.isin(rec_keys, rel_users * width + rel_items)
+    return hits & (rec_ids >= 0)
+
+
+def _n_recs(rec_ids, k):
+    return (rec_ids[:, :k] >= 0).sum(axis=1)
+
+
+def precision_at_k_matrix(rec_ids, hits, k=10):
+    """Same convention as `precision_at_k`: hits / min(k, number of recommendations)."""
+    n = np.minimum(k, _n_recs(rec_ids, k))
+    return np.divide(hits[:, :k].sum(axis=1), n, out=np.zeros(len(n)), where=n > 0)
+
+
+def recall_at_k_matrix(hits, n_relevant, k=10):
+    n_relevant = np.asarray(n_relevant)
+    return np.divide(hits[:, :k].sum(axis=1), n_relevant, out=np.zeros(len(n_relevant)), where=n_relevant > 0)
+
+
+def ndcg_at_k_matrix(hits, n_relevant, k=10):
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (hits[:, :k] * discounts[:hits[:, :k].shape[1]]).sum(axis=1)
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])[np.minimum(np.asarray(n_relevant), k)]
+    return np.divide(dcg, ideal, out=np.zeros(len(dcg)), where=ideal > 0)
+
+
+def average_precision_at_k_matrix(hits, n_relevant, k=10):
+    h = hits[:, :k].astype(float)
+    prec_at_rank = np.cumsum(h, axis=1) / np.arange(1, h.shape[1] + 1)
+    denom = np.minimum(np.asarray(n_relevant), k)
+    return np.divide((prec_at_rank * h).sum(axis=1), denom, out=np.zeros(len(denom)), where=denom > 0)
+
+
+def catalog_coverage(rec_ids, catalog_size, k=10):
+    """Fraction of the catalog recommended to at least one user (a single value)."""
+    recs = rec_ids[:, :k]
+    return len(np.unique(recs[recs >= 0])) / catalog_size if catalog_size else 0.0
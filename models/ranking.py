@@ -0,0 +1,23 @@
+# models/ranking.py
+import numpy as np
+
+
+def top_k_desc(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest finite scores, best first."""
+    finite = np.flatnonzero(np.isfinite(scores))
+    k = min(k, len(finite))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    vals = scores[finite]
+    part = np.argpartition(-vals, k - 1)[:k]
+    return finite[part[np.argsort(-vals[part], kind="stable")]]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Per-row positions of the k largest scores, best first (rows x k)."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    vals = np.take_along_axis(scores, part, axis=1)
+    return np.take_along_axis(part, np.argsort(-vals, axis=1, kind="stable"), axis=1)
@@ -1,10 +1,39 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from . import artifacts
 from .data_loader import DataLoader
 from .content_based import ContentBasedModel
+from .als import ALSCollaborativeFiltering
 from .collaborative_filtering import CollaborativeFiltering
 from .hybrid_model import HybridRecommender
-from .export_reports import export_excel
+from .history_index import PurchaseHistoryIndex
+from .catalog import ProductCatalog
+from .cache import RecommendationCache
+from .instrumentation import metrics
+from .interactions import INTERACTION_COLUMNS, InteractionBuilder, Interactions
+
+# columns a frame passed to `RecommenderSystem.update` must have
+UPDATE_COLUMNS = ["customer_id", "product_id", "quantity", "purchase_timestamp"]
+
+_worker_recsys = None
+
+
+def _init_export_worker(config, artifact_path):
+    global _worker_recsys
+    path = Path(artifact_path)
+    _worker_recsys = RecommenderSystem(config=config).load_models(root=path.parent, version=path.name)
+
+
+def _score_block(args):
+    customer_ids, top_n, block_size = args
+    df = _worker_recsys.recommend_batch(customer_ids, top_n=top_n, block_size=block_size)
+    return df, metrics.drain()  # the parent merges the worker's timings
 
 
 class RecommenderSystem:
@@ -16,38 +45,331 @@ class RecommenderSystem:
         self.collab_model = None
         self.hybrid_model = None
         self.products_df = None
+        self.catalog = None
         self.transactions_df = None
+        self.interactions = None
+        self.history_index = None
+        self.data_fingerprint = None
+        self.model_version = None
+        self.artifact_path = None  # artifact directory matching the in-memory models, if any
+        self.watermark = None  # latest purchase_timestamp folded into the models
+        self.last_transaction_id = None  # highest transaction_id folded into the models; drives `update`
+        self.aggregates = None  # AggregateStore backing popularity, if any
+        self.popularity_half_life = None  # half-life the popularity scores are decayed with; None for raw quantities
+        self.cache = RecommendationCache.from_config(self.config)
 
     # ---------- Data ----------
-    def load_data(self):
-        self.products_df = self.data.products()
-        self.transactions_df = self.data.transactions()
+    def load_data(self, refresh_aggregates=False):
+        """Load products and the interaction arrays the models train on.
+
+        With `data.chunk_size` set, transactions are streamed in chunks with only
+        the interaction columns projected, straight into an `InteractionBuilder`;
+        `transactions_df` is then left unloaded until something needs the full table.
+        The aggregate tables are only written with `refresh_aggregates` (build-models);
+        otherwise they are read as last refreshed.
+        """
+        chunk_size = self.config.get("data", {}).get("chunk_size", None)
+        self.data_fingerprint = self.data.fingerprint()
+        with metrics.timer("load.products"):
+            self.products_df = self.data.products()
+            self.catalog = ProductCatalog.from_frame(self.products_df)
+        with metrics.timer("load.transactions"):
+            if chunk_size:
+                builder = InteractionBuilder()
+                for chunk in self.data.transactions(columns=INTERACTION_COLUMNS, chunksize=chunk_size):
+                    builder.add(chunk)
+                self.interactions = builder.finish()
+                self.transactions_df = None
+            else:
+                self.transactions_df = self.data.transactions()
+                self.interactions = Interactions.from_frame(self.transactions_df)
+        metrics.inc("rows_loaded_total", len(self.products_df), table="products")
+        metrics.inc("rows_loaded_total", len(self.interactions.customer_ids), table="transactions")
+        with metrics.timer("load.history_index"):
+            self.history_index = self._build_history_index()
+        self.watermark = self.interactions.watermark
+        self.last_transaction_id = self.interactions.last_transaction_id
+        with metrics.timer("load.aggregates"):
+            self.aggregates = self._aggregate_store(refresh=refresh_aggregates)
+        metrics.snapshot_memory("load")
         return self
 
+    def _aggregate_store(self, refresh=False):
+        """`AggregateStore` when `popularity.source` is "aggregates" (default).
+
+        With `refresh` (and a writable engine) new transactions are folded in
+        first; otherwise the tables are used as last refreshed by a writer. None
+        when they do not exist, in which case popularity comes from the loaded
+        interactions.
+        """
+        if self.engine is None or self.config.get("popularity", {}).get("source", "aggregates") != "aggregates":
+            return None
+        from .aggregates import AggregateStore
+
+        store = AggregateStore.from_config(self.engine, self.config)
+        if refresh and not store.read_only:
+            store.refresh()
+        return store if store.exists() else None
+
+    def _build_history_index(self):
+        # same rows as DataLoader.user_history: transactions joined to known products
+        inter = self.interactions
+        known = self.catalog.index.positions(inter.product_ids) >= 0
+        return PurchaseHistoryIndex.from_transactions(pd.DataFrame({
+            "customer_id": inter.customer_ids[known],
+            "product_id": inter.product_ids[known],
+        }))
+
     # ---------- Train ----------
     def build_models(self):
-        if self.products_df is None or self.transactions_df is None:
+        """Fit the content and collaborative models and popularity, then blend them.
+
+        With `build.workers` > 1 the three run concurrently and item-item
+        similarities are computed in row shards across that many processes.
+        """
+        if self.products_df is None or (self.interactions is None and self.transactions_df is None):
             self.load_data()
+        if self.catalog is None:
+            self.catalog = ProductCatalog.from_frame(self.products_df)
+        if self.interactions is None:
+            self.interactions = Interactions.from_frame(self.transactions_df)
+        if self.history_index is None:
+            self.history_index = self._build_history_index()
         # content
         text_fields = self.config.get("content", {}).get("text_fields", ["product_name","category","subcategory","brand","description"])
         max_features = self.config.get("content", {}).get("max_features", 5000)
-        self.content_model = ContentBasedModel(text_fields=text_fields, max_features=max_features)
-        self.content_model.fit(self.products_df)
+        chunk_size = self.config.get("content", {}).get("chunk_size", None)
+        ann = self.config.get("content", {}).get("ann", None)
+        self.content_model = ContentBasedModel(text_fields=text_fields, max_features=max_features, chunk_size=chunk_size,
+                                               ann=ann)
         # collaborative
+        workers = self.config.get("build", {}).get("workers", 1)
         min_u = self.config.get("recommender", {}).get("min_interactions_user", 1)
         min_i = self.config.get("recommender", {}).get("min_interactions_item", 1)
-        self.collab_model = CollaborativeFiltering(min_u, min_i)
-        interactions = self.transactions_df[["customer_id","product_id","quantity","rating"]].copy()
-        self.collab_model.fit(interactions)
-        # popularity
-        pop = self.transactions_df.groupby("product_id")["quantity"].sum().sort_values(ascending=False)
+        backend = self.config.get("recommender", {}).get("collaborative_backend", "item_knn")
+        if backend == "als":
+            self.collab_model = ALSCollaborativeFiltering.from_config(self.config.get("recommender", {}).get("als", {}),
+                                                                      min_u, min_i)
+        elif backend == "item_knn":
+            neighbors_k = self.config.get("recommender", {}).get("neighbors_k", None)
+            block_size = self.config.get("recommender", {}).get("similarity_block_size", 1024)
+            self.collab_model = CollaborativeFiltering(min_u, min_i, neighbors_k=neighbors_k, block_size=block_size,
+                                                       workers=workers,
+                                                       tmp_dir=self.config.get("build", {}).get("tmp_dir"))
+        else:
+            raise ValueError(f"Unknown collaborative_backend {backend!r}; expected 'item_knn' or 'als'.")
+        inter = self.interactions
+
+        def fit_content():
+            with metrics.timer("build.content"):
+                self.content_model.fit(self.products_df, index=self.catalog.index)
+            metrics.snapshot_memory("build.content")
+
+        def fit_collaborative():
+            with metrics.timer("build.collaborative"):
+                self.collab_model.fit_arrays(inter.customer_ids, inter.product_ids, quantity=inter.quantity,
+                                             rating=inter.rating)
+            metrics.snapshot_memory("build.collaborative")
+
+        def popularity():
+            with metrics.timer("build.popularity"):
+                return self.aggregates.popularity() if self.aggregates is not None else inter.popularity()
+
+        if workers > 1:
+            # scikit-learn is imported lazily by the fits; first imports racing across
+            # threads can see partially initialized modules, so import it here once
+            import sklearn.feature_extraction.text  # noqa: F401
+            import sklearn.metrics.pairwise  # noqa: F401
+            import sklearn.preprocessing  # noqa: F401
+
+            # TF-IDF holds the GIL while the similarity shards run in worker processes
+            with ThreadPoolExecutor(3) as pool:
+                futures = [pool.submit(fit_content), pool.submit(fit_collaborative), pool.submit(popularity)]
+                pop = [f.result() for f in futures][2]
+        else:
+            fit_content()
+            fit_collaborative()
+            pop = popularity()
+        self.popularity_half_life = self.aggregates.half_life_days if self.aggregates is not None else None
         # hybrid
         weights = self.config.get("recommender", {}).get("weights", None)
-        self.hybrid_model = HybridRecommender(self.collab_model, self.content_model, pop, weights)
+        with metrics.timer("build.hybrid"):
+            self.hybrid_model = HybridRecommender(self.collab_model, self.content_model, pop, weights,
+                                                  item_index=self.catalog.index)
+        self.model_version = artifacts.new_version(self.data_fingerprint or "")
+        self.artifact_path = None
+        return self
+
+    # ---------- Artifacts ----------
+    def _artifact_dir(self, root=None):
+        return root or self.config.get("artifacts", {}).get("dir", "artifacts")
+
+    def save_models(self, root=None):
+        if self.hybrid_model is None:
+            self.build_models()
+        keep = self.config.get("artifacts", {}).get("keep", 3)
+        with metrics.timer("artifacts.save"):
+            self.artifact_path = artifacts.write_artifacts(
+                self._artifact_dir(root),
+                self.model_version,
+                self.data_fingerprint or "",
+                self.collab_model,
+                self.content_model,
+                self.hybrid_model.popularity,
+                self.products_df,
+                history_index=self.history_index,
+                watermark=self.watermark,
+                last_transaction_id=self.last_transaction_id,
+                popularity_half_life=self.popularity_half_life,
+                keep=keep,
+            )
+        return self.artifact_path
+
+    def load_models(self, root=None, version=None, mmap=True):
+        path = artifacts.resolve_version(self._artifact_dir(root), version)
+        with metrics.timer("artifacts.load"):
+            arts = artifacts.read_artifacts(path, mmap=mmap)
+        manifest = arts["manifest"]
+        self.products_df = arts["products"]
+        self.catalog = ProductCatalog.from_frame(self.products_df)
+
+        self.content_model = None
+        if "content" in arts:
+            c = manifest["content"]
+            self.content_model = ContentBasedModel(text_fields=c["text_fields"], max_features=c["max_features"],
+                                                   ann=c.get("ann"))
+            self.content_model.restore(**arts["content"], index=self.catalog.index)
+        self.collab_model = None
+        if "collab" in arts:
+            c = manifest["collaborative"]
+            if c.get("backend") == "als":
+                self.collab_model = ALSCollaborativeFiltering(
+                    c["min_interactions_user"], c["min_interactions_item"], block_size=c["block_size"], **c["als"],
+                )
+            else:
+                self.collab_model = CollaborativeFiltering(
+                    c["min_interactions_user"], c["min_interactions_item"],
+                    neighbors_k=c["neighbors_k"], block_size=c["block_size"],
+                )
+            self.collab_model.restore(**arts["collab"])
+
+        self.transactions_df = None
+        self.interactions = None
+        self.history_index = arts["history"]
+        if self.history_index is None:
+            self.transactions_df = self.data.transactions()
+            self.interactions = Interactions.from_frame(self.transactions_df)
+            self.history_index = self._build_history_index()
+        weights = self.config.get("recommender", {}).get("weights", None)
+        self.hybrid_model = HybridRecommender(self.collab_model, self.content_model, arts["popularity"], weights,
+                                              item_index=self.catalog.index)
+        self.data_fingerprint = manifest["fingerprint"]
+        self.model_version = manifest["version"]
+        self.watermark = pd.Timestamp(manifest["watermark"]) if manifest.get("watermark") else None
+        self.last_transaction_id = manifest.get("last_transaction_id")
+        self.popularity_half_life = manifest.get("popularity_half_life_days")
+        self.artifact_path = path
+        return self
+
+    def is_stale(self):
+        """True when the source tables changed since the loaded models were built."""
+        return self.data_fingerprint != self.data.fingerprint()
+
+    def ensure_artifact(self, root=None):
+        """Path of an up-to-date artifact, building and saving one if missing or stale.
+
+        Only the manifest is read when the latest artifact is current, so callers
+        that load the models elsewhere (serving workers) do not hold a copy.
+        """
+        try:
+            path = artifacts.resolve_version(self._artifact_dir(root))
+            manifest = artifacts.read_manifest(path)
+            if manifest.get("format") == artifacts.ARTIFACT_FORMAT and manifest["fingerprint"] == self.data.fingerprint():
+                return path
+        except FileNotFoundError:
+            pass
+        return self.load_data().build_models().save_models(root)
+
+    def load_or_build_models(self, root=None):
+        """Load the latest artifact; rebuild and persist it if missing or stale."""
+        try:
+            self.load_models(root)
+            if not self.is_stale():
+                return self
+        except (FileNotFoundError, ValueError):
+            pass  # missing, or written in an older artifact format
+        self.load_data().build_models()
+        self.save_models(root)
+        return self
+
+    # ---------- Incremental ----------
+    def update(self, new_transactions=None):
+        """Fold transactions newer than the high-water mark into the built models.
+
+        With no argument, reads transactions with a transaction_id above
+        `self.last_transaction_id` from the database. A frame passed in must have
+        the UPDATE_COLUMNS; its rows are weighed into popularity like the
+        aggregates weigh them, but are not written to the aggregate tables.
+        Products added since the last build still need `build_models`.
+        """
+        if self.hybrid_model is None:
+            raise ValueError("Models not built.")
+        from_db = new_transactions is None
+        if from_db:
+            if self.last_transaction_id is None and self.watermark is not None:
+                raise ValueError("The loaded models predate transaction_id high-water marks; run build-models.")
+            new_transactions = self.data.transactions_since(self.last_transaction_id)
+        else:
+            missing = [c for c in UPDATE_COLUMNS if c not in new_transactions]
+            if missing:
+                raise ValueError(f"update() needs the columns {UPDATE_COLUMNS}; missing {missing}.")
+            new_transactions = new_transactions.assign(
+                purchase_timestamp=pd.to_datetime(new_transactions["purchase_timestamp"]))
+        if new_transactions.empty:
+            return self
+
+        metrics.inc("rows_loaded_total", len(new_transactions), table="transactions")
+        cols = [c for c in ("customer_id", "product_id", "quantity", "rating") if c in new_transactions]
+        with metrics.timer("update.collaborative"):
+            self.collab_model.update(new_transactions[cols])
+        if from_db:
+            if self.aggregates is None:
+                self.aggregates = self._aggregate_store(refresh=True)
+            elif not self.aggregates.read_only:
+                self.aggregates.refresh()
+        if from_db and self.aggregates is not None:
+            pop = self.aggregates.popularity()
+            self.popularity_half_life = self.aggregates.half_life_days
+        else:
+            from .aggregates import fold_popularity
+
+            # decayed scores are relative to the latest purchase folded so far, the watermark
+            pop = fold_popularity(self.hybrid_model.popularity, new_transactions, self.watermark,
+                                  self.popularity_half_life)
+        self.hybrid_model.refresh(pop)
+        known = new_transactions[new_transactions.product_id.isin(self.catalog.product_ids)]
+        self.history_index = self.history_index.append(known)
+        if self.transactions_df is not None:
+            self.transactions_df = pd.concat([self.transactions_df, new_transactions], ignore_index=True)
+        for cid in new_transactions.customer_id.unique().tolist():
+            self.invalidate_customer(cid)
+        if self.interactions is not None:
+            self.interactions = self.interactions.append(new_transactions)
+
+        latest = new_transactions["purchase_timestamp"].max()
+        self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+        if "transaction_id" in new_transactions:
+            last = int(new_transactions["transaction_id"].max())
+            self.last_transaction_id = last if self.last_transaction_id is None else max(self.last_transaction_id, last)
+        if from_db:
+            self.data_fingerprint = self.data.fingerprint()
+        self.model_version = artifacts.new_version(self.data_fingerprint or "")
+        self.artifact_path = None
         return self
 
     # ---------- Recommend ----------
     def get_purchase_history(self, customer_id):
+        """Detailed history table from SQL (dashboard); scoring uses `history_index`."""
         return self.data.user_history(customer_id)
 
     def recommend_products(self, customer_id, top_n=None):
@@ -55,30 +377,134 @@ class RecommenderSystem:
             self.build_models()
         if top_n is None:
             top_n = self.config.get("recommender", {}).get("top_n", 10)
-        hist = self.get_purchase_history(customer_id)
-        purchased = hist["product_id"].tolist()
-        recs = self.hybrid_model.recommend(customer_id, purchased, top_n=top_n)
-        # decorate
-        out_rows = []
-        for rank, (pid, score) in enumerate(recs, start=1):
-            prod = self.products_df[self.products_df.product_id == pid].iloc[0]
-            out_rows.append({
-                "rank": rank,
-                "product_id": pid,
-                "score": score,
-                "product_name": prod.product_name,
-                "category": prod.category,
-                "subcategory": prod.subcategory,
-                "brand": prod.brand,
-                "price": prod.price,
-            })
-        return pd.DataFrame(out_rows)
+        if self.cache is not None:
+            cached = self.cache.get(customer_id, top_n, self.model_version)
+            if cached is not None:
+                return cached.copy()
+        with metrics.timer("recommend.history"):
+            purchased = self.history_index.get(customer_id).tolist()
+        with metrics.timer("recommend.hybrid"):
+            recs = self.hybrid_model.recommend(customer_id, purchased, top_n=top_n)
+        with metrics.timer("recommend.decorate"):
+            out = self._decorate(recs)
+        if self.cache is not None:
+            self.cache.put(customer_id, top_n, self.model_version, out.copy())
+        return out
+
+    def similar_products(self, product_id, top_n=None, exact=False):
+        """Products with the most similar text, via the content ANN index when one was built."""
+        if self.hybrid_model is None:
+            self.build_models()
+        if top_n is None:
+            top_n = self.config.get("recommender", {}).get("top_n", 10)
+        return self._decorate(self.content_model.recommend_similar(product_id, top_n=top_n, exact=exact))
+
+    def invalidate_customer(self, customer_id):
+        """Drop cached recommendations of a customer whose transactions changed."""
+        return self.cache.invalidate_customer(customer_id) if self.cache is not None else 0
+
+    def _decorate(self, recs, customer_ids=None):
+        """Join product metadata onto ranked (product_id, score) lists in one take.
+
+        `recs` is one list per customer when `customer_ids` is given, else a single list.
+        """
+        lists = recs if customer_ids is not None else [recs]
+        counts = [len(r) for r in lists]
+        pids = [pid for r in lists for pid, _ in r]
+        out = pd.DataFrame({
+            "rank": np.concatenate([np.arange(1, n + 1) for n in counts]) if pids else np.zeros(0, dtype=np.int64),
+            "product_id": pids,
+            "score": [score for r in lists for _, score in r],
+        })
+        if customer_ids is not None:
+            out.insert(0, "customer_id", np.repeat(customer_ids, counts))
+        meta = self.catalog.take(pids)
+        return pd.concat([out, meta], axis=1)
+
+    def recommend_batch(self, customer_ids, top_n=None, block_size=None):
+        """Recommendations for many customers as one long DataFrame.
+
+        Customers are scored `block_size` at a time (`recommender.batch_size`), so
+        memory stays bounded by block_size x catalog scores.
+        """
+        if self.hybrid_model is None:
+            self.build_models()
+        if top_n is None:
+            top_n = self.config.get("recommender", {}).get("top_n", 10)
+        if block_size is None:
+            block_size = self.config.get("recommender", {}).get("batch_size", 512)
+        customer_ids = list(customer_ids)
+        with metrics.timer("recommend_batch.history"):
+            purchased = self.history_index.get_many(customer_ids)
+        with metrics.timer("recommend_batch.hybrid"):
+            recs = self.hybrid_model.recommend_batch(customer_ids, purchased, top_n=top_n, block_size=block_size)
+        with metrics.timer("recommend_batch.decorate"):
+            return self._decorate(recs, customer_ids=customer_ids)
 
     # ---------- Export ----------
-    def export_all(self, outpath="data/sample_reports.xlsx", top_n=None):
+    def export_all(self, outpath="data/sample_reports.xlsx", top_n=None, progress=None):
+        """Excel report for every customer; `progress(done, total)` is called after each scored block."""
+        from .export_reports import export_excel
+
+        if self.transactions_df is None:
+            self.transactions_df = self.data.transactions()
         customers_df = self.data.customers()
-        recs_dict = {}
-        for cid in customers_df.customer_id.tolist():
-            recs_dict[cid] = self.recommend_products(cid, top_n=top_n)
-        export_excel(customers_df, self.products_df, self.transactions_df, recs_dict, outpath)
+        customer_ids = customers_df.customer_id.tolist()
+        block_size = self.config.get("recommender", {}).get("batch_size", 512)
+        parts = []
+        for i, df in enumerate(self.iter_recommendation_batches(customer_ids, top_n=top_n, block_size=block_size)):
+            parts.append(df)
+            if progress is not None:
+                progress(min((i + 1) * block_size, len(customer_ids)), len(customer_ids))
+        recs = pd.concat(parts, ignore_index=True) if parts else self.recommend_batch([], top_n=top_n)
+        grouped = {cid: df.drop(columns="customer_id").reset_index(drop=True) for cid, df in recs.groupby("customer_id", sort=False)}
+        recs_dict = {cid: grouped.get(cid, recs.iloc[0:0].drop(columns="customer_id")) for cid in customer_ids}
+        with metrics.timer("export.excel"):
+            export_excel(customers_df, self.products_df, self.transactions_df, recs_dict, outpath)
+        return outpath
+
+    def iter_recommendation_batches(self, customer_ids, top_n=None, block_size=None, workers=1):
+        """Yield `recommend_batch` frames for consecutive customer blocks, in order.
+
+        With workers > 1, blocks are scored in a process pool whose workers
+        memory-map the model artifact; at most 2 x workers blocks are in flight, so
+        results never pile up faster than the consumer writes them.
+        """
+        if self.hybrid_model is None:
+            self.build_models()
+        if top_n is None:
+            top_n = self.config.get("recommender", {}).get("top_n", 10)
+        if block_size is None:
+            block_size = self.config.get("recommender", {}).get("batch_size", 512)
+        customer_ids = list(customer_ids)
+        blocks = (customer_ids[i:i + block_size] for i in range(0, len(customer_ids), block_size))
+        if workers <= 1:
+            for block in blocks:
+                yield self.recommend_batch(block, top_n=top_n, block_size=block_size)
+            return
+
+        path = self.artifact_path or self.save_models()
+        with ProcessPoolExecutor(workers, initializer=_init_export_worker, initargs=(self.config, str(path))) as pool:
+            pending = deque(pool.submit(_score_block, (b, top_n, block_size)) for b in islice(blocks, 2 * workers))
+            while pending:
+                df, worker_metrics = pending.popleft().result()
+                metrics.merge(worker_metrics)
+                nxt = next(blocks, None)
+                if nxt is not None:
+                    pending.append(pool.submit(_score_block, (nxt, top_n, block_size)))
+                yield df
+
+    def export_stream(self, outpath, top_n=None, fmt=None, workers=None):
+        """Stream recommendations for every customer into one long csv/parquet/xlsx table."""
+        from .export_reports import export_stream
+
+        if workers is None:
+            workers = self.config.get("export", {}).get("workers", 1)
+        if self.hybrid_model is None:
+            self.build_models()
+        customer_ids = self.data.customers(columns=["customer_id"]).customer_id.tolist()
+        batches = self.iter_recommendation_batches(customer_ids, top_n=top_n, workers=workers)
+        columns = ["customer_id", "rank", "product_id", "score", *self.catalog.columns]
+        with metrics.timer("export.stream"):
+            export_stream(batches, outpath, fmt=fmt, columns=columns)
         return outpath
@@ -0,0 +1,111 @@
+# models/sharded_similarity.py
+"""Item-item cosine similarities in row shards across a process pool.
+
+Kept free of pandas and the rest of the model stack: spawned workers import
+only this module, NumPy and SciPy.
+"""
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+_shard_items = None  # (items, items_t) CSR memory-mapped by pool workers
+
+
+def _save_csr(directory, name, matrix):
+    for part in ("data", "indices", "indptr"):
+        np.save(directory / f"{name}_{part}.npy", getattr(matrix, part))
+
+
+def _load_csr(directory, name, shape):
+    parts = [np.load(directory / f"{name}_{part}.npy", mmap_mode="r") for part in ("data", "indices", "indptr")]
+    return csr_matrix(tuple(parts), shape=shape, copy=False)
+
+
+def _init_worker(directory, shape):
+    global _shard_items
+    directory = Path(directory)
+    _shard_items = (_load_csr(directory, "items", shape), _load_csr(directory, "items_t", shape[::-1]))
+
+
+def _shard(args):
+    """Write rows [start, stop) into the memory-mapped outputs; returns rows done."""
+    directory, start, stop, k, block_size = args
+    items, items_t = _shard_items
+    directory = Path(directory)
+    if k:
+        cols = np.load(directory / "cols.npy", mmap_mode="r+")
+        vals = np.load(directory / "vals.npy", mmap_mode="r+")
+    else:
+        sims = np.load(directory / "sims.npy", mmap_mode="r+")
+    for lo in range(start, stop, block_size):
+        ids = np.arange(lo, min(lo + block_size, stop))
+        block = (items[ids] @ items_t).toarray()
+        if k:
+            block[np.arange(len(ids)), ids] = 0.0
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            cols[ids] = top
+            vals[ids] = np.take_along_axis(block, top, axis=1)
+        else:
+            sims[ids] = block
+    for out in (cols, vals) if k else (sims,):
+        out.flush()
+    return stop - start
+
+
+def sharded_item_similarities(matrix, k=None, workers=2, block_size=1024, shards_per_worker=4, tmp_dir=None):
+    """Cosine similarities of the item columns of a users x items matrix.
+
+    The L2-normalized item vectors are written once to a scratch directory and
+    memory-mapped by every worker; each shard writes its rows straight into
+    preallocated memory-mapped outputs (items x k neighbor ids/scores, or the
+    dense items x items matrix), so no result is pickled back. Rows land at
+    fixed offsets, so the merge is independent of shard completion order and
+    the result is identical to `topk_item_neighbors` (with `k`) or the dense
+    cosine matrix (without).
+    """
+    from sklearn.preprocessing import normalize
+
+    items = normalize(matrix.T.tocsr(), norm="l2", axis=1)  # items x users
+    n_items = items.shape[0]
+    if k is not None:
+        k = max(0, min(int(k), n_items - 1))
+        if k == 0:
+            return csr_matrix((n_items, n_items), dtype=np.float32)
+    directory = Path(tempfile.mkdtemp(prefix="recsys-sims-", dir=tmp_dir))
+    try:
+        _save_csr(directory, "items", items)
+        _save_csr(directory, "items_t", items.T.tocsr())
+        if k:
+            np.lib.format.open_memmap(directory / "cols.npy", mode="w+", dtype=np.int32, shape=(n_items, k))
+            np.lib.format.open_memmap(directory / "vals.npy", mode="w+", dtype=np.float64, shape=(n_items, k))
+        else:
+            np.lib.format.open_memmap(directory / "sims.npy", mode="w+", dtype=np.float64, shape=(n_items, n_items))
+
+        step = max(1, -(-n_items // (workers * shards_per_worker)))
+        shards = [(str(directory), lo, min(lo + step, n_items), k, block_size) for lo in range(0, n_items, step)]
+        # spawned, not forked: the build may be fitting the content model on another thread
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(str(directory), items.shape)) as pool:
+            done = sum(pool.map(_shard, shards))
+        if done != n_items:
+            raise RuntimeError(f"Similarity shards covered {done} of {n_items} items.")
+
+        if not k:
+            return np.load(directory / "sims.npy")
+        cols = np.load(directory / "cols.npy")
+        vals = np.load(directory / "vals.npy")
+        keep = vals > 0
+        rows = np.broadcast_to(np.arange(n_items)[:, None], cols.shape)
+        sims = csr_matrix(
+            (vals[keep].astype(np.float32), (rows[keep].astype(np.int64), cols[keep].astype(np.int32))),
+            shape=(n_items, n_items),
+        )
+        sims.sort_indices()
+        return sims
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
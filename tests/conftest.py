@@ -0,0 +1,85 @@
+# tests/conftest.py
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+SCHEMA = ROOT / "database" / "schema.sql"
+sys.path.insert(0, str(ROOT))
+
+
+def make_transactions(n=600, n_customers=40, n_products=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "transaction_id": np.arange(1, n + 1),
+        "customer_id": rng.integers(1, n_customers + 1, n),
+        "product_id": rng.integers(1, n_products + 1, n),
+        "quantity": rng.integers(1, 4, n).astype(float),
+        "purchase_timestamp": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.arange(n), unit="h"),
+    })
+
+
+def make_catalog(rows):
+    """products and customers frames covering every id in `rows`."""
+    product_ids = sorted(set(rows.product_id))
+    customer_ids = sorted(set(rows.customer_id))
+    products = pd.DataFrame({
+        "product_id": product_ids,
+        "product_name": [f"Product {p}" for p in product_ids],
+        "category": [["Home", "Fashion", "Electronics"][p % 3] for p in product_ids],
+        "subcategory": "General",
+        "brand": [f"Brand{p % 5}" for p in product_ids],
+        "price": 10.0,
+        "description": [f"item number {p} in line {p % 4}" for p in product_ids],
+    })
+    customers = pd.DataFrame({"customer_id": customer_ids, "customer_name": [f"C{c}" for c in customer_ids]})
+    return products, customers
+
+
+def append_transactions(path, rows):
+    con = sqlite3.connect(path)
+    rows.assign(purchase_timestamp=rows["purchase_timestamp"].astype(str)).to_sql(
+        "transactions", con, if_exists="append", index=False)
+    con.commit()
+    con.close()
+
+
+@pytest.fixture
+def transactions():
+    return make_transactions()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """Factory: SQLite database `name` with the schema, a catalog covering `catalog_rows` and `rows`."""
+    def create(name, rows, catalog_rows=None):
+        path = tmp_path / f"{name}.db"
+        products, customers = make_catalog(rows if catalog_rows is None else catalog_rows)
+        con = sqlite3.connect(path)
+        con.executescript(SCHEMA.read_text(encoding="utf-8"))
+        customers.to_sql("customers", con, if_exists="append", index=False)
+        products.to_sql("products", con, if_exists="append", index=False)
+        con.commit()
+        con.close()
+        append_transactions(path, rows)
+        return path
+    return create
+
+
+@pytest.fixture
+def built_recommender(sqlite_db, tmp_path):
+    """Factory: RecommenderSystem built on `sqlite_db(name, rows, catalog_rows)`, artifacts under tmp_path."""
+    from sqlalchemy import create_engine
+
+    from models.recommender import RecommenderSystem
+
+    def build(name, rows, config=None, catalog_rows=None):
+        path = sqlite_db(name, rows, catalog_rows)
+        config = {"artifacts": {"dir": str(tmp_path / f"{name}-artifacts")}, **(config or {})}
+        recsys = RecommenderSystem(engine=create_engine(f"sqlite:///{path}"), config=config)
+        return recsys.load_data(refresh_aggregates=True).build_models()
+    return build
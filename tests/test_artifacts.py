@@ -0,0 +1,51 @@
+# tests/test_artifacts.py
+"""Models saved as an artifact and loaded back must score exactly like the models that were saved."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from models import artifacts
+from models.recommender import RecommenderSystem
+
+
+def test_frame_round_trip(tmp_path):
+    df = pd.DataFrame({
+        "product_id": np.array([3, 1, 2], dtype=np.int32),
+        "price": np.array([1.5, np.nan, 2.0], dtype=np.float32),
+        "brand": pd.Categorical(["a", None, "b"]),
+        "description": ["x", None, ""],
+    })
+    meta = artifacts.save_frame(tmp_path, "products", df)
+    pd.testing.assert_frame_equal(artifacts.load_frame(tmp_path, "products", meta), df)
+    assert not list(tmp_path.glob("products/*.pkl"))
+
+
+@pytest.mark.parametrize("neighbors_k", [None, 5])
+def test_saved_models_load_back(built_recommender, transactions, neighbors_k):
+    built = built_recommender("db", transactions, {"recommender": {"neighbors_k": neighbors_k},
+                                                   "popularity": {"half_life_days": 7.0}})
+    path = built.save_models()
+    manifest = artifacts.read_manifest(path)
+    assert manifest["format"] == artifacts.ARTIFACT_FORMAT
+    assert manifest["last_transaction_id"] == transactions.transaction_id.max()
+    assert manifest["popularity_half_life_days"] == 7.0
+
+    loaded = RecommenderSystem(engine=built.engine, config=built.config).load_models()
+    assert loaded.model_version == built.model_version
+    assert not loaded.is_stale()
+    assert loaded.last_transaction_id == built.last_transaction_id
+    assert loaded.popularity_half_life == built.popularity_half_life
+    pd.testing.assert_frame_equal(loaded.products_df, built.products_df)
+    pd.testing.assert_series_equal(loaded.hybrid_model.popularity, built.hybrid_model.popularity)
+    customers = [1, 5, 17, 999]
+    pd.testing.assert_frame_equal(loaded.recommend_batch(customers), built.recommend_batch(customers))
+
+
+def test_data_change_marks_artifact_stale(built_recommender, transactions):
+    built = built_recommender("db", transactions)
+    built.save_models()
+    loaded = RecommenderSystem(engine=built.engine, config=built.config).load_models()
+    with built.engine.begin() as conn:  # same row count, ids and text lengths
+        conn.exec_driver_sql("UPDATE products SET product_name = 'Product X' WHERE product_id = 1")
+    assert loaded.is_stale()
+    assert built.ensure_artifact() != loaded.artifact_path
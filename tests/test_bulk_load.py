@@ -0,0 +1,91 @@
+# tests/test_bulk_load.py
+"""An interrupted `bulk_load` resumed with `resume=True` must load every row exactly once."""
+import sys
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from conftest import ROOT, SCHEMA
+
+for sub in (("database", "database"), ("database", "database", "database")):
+    sys.path.insert(0, str(ROOT.joinpath(*sub)))
+
+import insert_data  # noqa: E402
+
+
+def write_csvs(data_dir, n_customers=23, n_products=11, n_transactions=57):
+    customers = pd.DataFrame({
+        "customer_id": range(1, n_customers + 1),
+        "customer_name": [f"Customer {c}" for c in range(1, n_customers + 1)],
+        "segment": "Retail",
+        "location": "Paris",
+    })
+    products = pd.DataFrame({
+        "product_id": range(1, n_products + 1),
+        "product_name": [f"Product {p}" for p in range(1, n_products + 1)],
+        "category": "Home",
+        "subcategory": "General",
+        "brand": "Acme",
+        "price": [float(p) for p in range(1, n_products + 1)],
+        # quoted newlines: one CSV record spans several lines
+        "description": [f"line one of {p}\nline two, \"quoted\"" for p in range(1, n_products + 1)],
+    })
+    transactions = pd.DataFrame({
+        "transaction_id": range(1, n_transactions + 1),
+        "customer_id": [1 + t % n_customers for t in range(n_transactions)],
+        "product_id": [1 + t % n_products for t in range(n_transactions)],
+        "quantity": 1,
+        "unit_price": 2.5,
+        "rating": 4.0,
+        "purchase_timestamp": "2025-01-01 00:00:00",
+    })
+    frames = {"customers": customers, "products": products, "transactions": transactions}
+    for name, frame in frames.items():
+        frame.to_csv(data_dir / f"{name}.csv", index=False)
+    return frames
+
+
+def table(engine, name, key):
+    return pd.read_sql(f"SELECT * FROM {name} ORDER BY {key}", engine)
+
+
+def test_resume_after_interruption_loads_each_row_once(tmp_path, monkeypatch, capsys):
+    frames = write_csvs(tmp_path)
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    insert_data.load_schema(engine, str(SCHEMA))
+
+    # fail on the third transactions chunk: customers and products are done, transactions half way
+    insert_chunk, calls = insert_data._insert_chunk, []
+
+    def failing_insert(conn, name, chunk):
+        if name == "transactions":
+            calls.append(len(chunk))
+            if len(calls) == 3:
+                raise RuntimeError("interrupted")
+        insert_chunk(conn, name, chunk)
+
+    monkeypatch.setattr(insert_data, "_insert_chunk", failing_insert)
+    with pytest.raises(RuntimeError):
+        insert_data.bulk_load(engine, str(tmp_path), str(SCHEMA), chunk_size=10)
+    with engine.connect() as conn:
+        assert insert_data._progress(conn) == {"customers": 23, "products": 11, "transactions": 20}
+
+    monkeypatch.setattr(insert_data, "_insert_chunk", insert_chunk)
+    assert insert_data.bulk_load(engine, str(tmp_path), str(SCHEMA), chunk_size=10, resume=True) == 37
+    assert "resumed after 20" in capsys.readouterr().out
+
+    for name, key in (("customers", "customer_id"), ("products", "product_id"), ("transactions", "transaction_id")):
+        pd.testing.assert_frame_equal(table(engine, name, key), frames[name], check_dtype=False)
+
+    # a second resume after completion is a no-op
+    assert insert_data.bulk_load(engine, str(tmp_path), str(SCHEMA), chunk_size=10, resume=True) == 0
+    assert len(table(engine, "transactions", "transaction_id")) == 57
+
+
+def test_read_chunks_skips_records_not_lines(tmp_path):
+    frames = write_csvs(tmp_path)
+    chunks = list(insert_data._read_chunks(tmp_path / "products.csv", chunk_size=4, skip=6))
+    assert [len(c) for c in chunks] == [4, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True),
+                                  frames["products"].iloc[6:].reset_index(drop=True))
@@ -0,0 +1,53 @@
+# tests/test_cache.py
+"""Recommendation cache: LRU + TTL bookkeeping and invalidation when a customer's data changes."""
+import pandas as pd
+
+from conftest import append_transactions
+from models.cache import RecommendationCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_lru_and_invalidation():
+    clock = Clock()
+    cache = RecommendationCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put(1, 5, "v1", "a")
+    cache.put(2, 5, "v1", "b")
+    assert cache.get(1, 5, "v1") == "a"
+    assert cache.get(1, 5, "v2") is None  # another model version never hits
+    cache.put(3, 5, "v1", "c")  # evicts customer 2, the least recently used
+    assert cache.get(2, 5, "v1") is None and cache.evictions == 1
+    assert cache.invalidate_customer(1) == 1
+    assert cache.get(1, 5, "v1") is None
+    clock.now = 11
+    assert cache.get(3, 5, "v1") is None and cache.expirations == 1
+
+
+def test_cache_off_unless_enabled():
+    assert RecommendationCache.from_config({}) is None
+    assert RecommendationCache.from_config({}, enabled=True) is not None
+    assert RecommendationCache.from_config({"cache": {"enabled": False}}, enabled=True) is None
+
+
+def test_update_invalidates_changed_customers(built_recommender, transactions):
+    old, new = transactions.iloc[:500], transactions.iloc[500:]
+    recsys = built_recommender("db", old, {"cache": {"enabled": True}}, catalog_rows=transactions)
+    changed = int(new.customer_id.iloc[0])
+    unchanged = int(sorted(set(old.customer_id) - set(new.customer_id))[0])
+    recsys.recommend_products(changed)
+    recsys.recommend_products(unchanged)
+    assert recsys.cache.stats()["size"] == 2
+
+    append_transactions(recsys.engine.url.database, new)
+    recsys.update()
+    assert recsys.cache.invalidations == 1
+    assert recsys.cache.stats()["size"] == 1  # only the unchanged customer's entry is left
+    cached = recsys.recommend_products(changed)
+    recsys.cache = None
+    pd.testing.assert_frame_equal(cached, recsys.recommend_products(changed))
@@ -0,0 +1,32 @@
+# tests/test_export_stream.py
+"""`export_stream` writes every batch under one fixed set of columns."""
+import pandas as pd
+import pytest
+
+from models.export_reports import export_stream
+
+COLUMNS = ["customer_id", "rank", "product_id", "score", "product_name", "price"]
+
+
+def batch(customer_id, product_name, price):
+    return pd.DataFrame({"customer_id": [customer_id], "rank": [1], "product_id": [7], "score": [0.5],
+                         "product_name": [product_name], "price": [price]})
+
+
+def test_parquet_column_null_in_first_batch(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = tmp_path / "recs.parquet"
+    assert export_stream([batch(1, None, None), batch(2, "Lamp", 9.5)], out, columns=COLUMNS) == 2
+    table = pq.read_table(out)
+    assert table.schema.field("product_name").type == "string"
+    assert table.column("product_name").to_pylist() == [None, "Lamp"]
+
+
+@pytest.mark.parametrize("suffix", ["csv", "xlsx", "parquet"])
+def test_empty_export_keeps_columns(tmp_path, suffix):
+    if suffix == "parquet":
+        pytest.importorskip("pyarrow")
+    out = tmp_path / f"recs.{suffix}"
+    assert export_stream([], out, columns=COLUMNS) == 0
+    read = {"csv": pd.read_csv, "xlsx": pd.read_excel, "parquet": pd.read_parquet}[suffix]
+    assert read(out).columns.tolist() == COLUMNS
@@ -0,0 +1,96 @@
+# tests/test_incremental_update.py
+"""`update()` must leave the models where a full fit on all rows would."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import append_transactions
+from models.collaborative_filtering import CollaborativeFiltering
+
+
+def split(df, at=580):
+    # a small batch, so most items are untouched and stale neighbor lists would show
+    old, new = df.iloc[:at], df.iloc[at:].copy()
+    # unseen customers and products in the new rows
+    new.iloc[:10, new.columns.get_loc("customer_id")] = 1000 + np.arange(10)
+    new.iloc[5:15, new.columns.get_loc("product_id")] = 500 + np.arange(10)
+    return old, new
+
+
+def dense_sims(model):
+    """Item-item similarities as a frame labelled by product_id, so index order does not matter."""
+    sims = model.item_sims.toarray() if hasattr(model.item_sims, "toarray") else np.asarray(model.item_sims)
+    ids = [model.index_item[i] for i in range(len(model.index_item))]
+    return pd.DataFrame(sims, index=ids, columns=ids).sort_index().sort_index(axis=1)
+
+
+@pytest.mark.parametrize("neighbors_k", [None, 5])
+def test_collaborative_update_matches_fit(transactions, neighbors_k):
+    old, new = split(transactions)
+    updated = CollaborativeFiltering(neighbors_k=neighbors_k, block_size=7).fit(old).update(new)
+    full = CollaborativeFiltering(neighbors_k=neighbors_k, block_size=7).fit(pd.concat([old, new]))
+
+    assert updated.user_index.keys() == full.user_index.keys()
+    assert updated.item_index.keys() == full.item_index.keys()
+    pd.testing.assert_frame_equal(dense_sims(updated), dense_sims(full), atol=1e-6, rtol=0)
+    for cid in (1, 1000, 1005):
+        a = dict(updated.recommend_for_user(cid, top_n=10))
+        b = dict(full.recommend_for_user(cid, top_n=10))
+        assert a.keys() == b.keys()
+        assert np.allclose([a[p] for p in b], list(b.values()))
+
+
+def assert_same_recommendations(a, b, customers=(1, 7, 1000, 1009)):
+    for cid in customers:
+        x = a.recommend_products(cid, top_n=10)
+        y = b.recommend_products(cid, top_n=10)
+        assert set(x.product_id) == set(y.product_id)
+        assert np.allclose(np.sort(x.score.to_numpy()), np.sort(y.score.to_numpy()))
+
+
+@pytest.mark.parametrize("from_frame", [False, True])
+@pytest.mark.parametrize("neighbors_k", [None, 5])
+def test_recommender_update_matches_rebuild(built_recommender, transactions, neighbors_k, from_frame):
+    old, new = split(transactions)
+    rows = pd.concat([old, new])
+    config = {"popularity": {"source": "transactions"}, "recommender": {"neighbors_k": neighbors_k}}
+
+    incremental = built_recommender("inc", old, config, catalog_rows=rows)
+    if from_frame:
+        incremental.update(new)
+    else:
+        append_transactions(incremental.engine.url.database, new)
+        incremental.update()
+    assert incremental.last_transaction_id == new.transaction_id.max()
+
+    full = built_recommender("full", rows, config)
+    assert_same_recommendations(incremental, full)
+
+
+@pytest.mark.parametrize("from_frame", [False, True])
+@pytest.mark.parametrize("half_life_days", [None, 3.0])
+def test_update_popularity_matches_aggregates(built_recommender, transactions, half_life_days, from_frame):
+    # a frame passed to update() must be weighed like the aggregate tables weigh database rows
+    old, new = split(transactions)
+    rows = pd.concat([old, new])
+    config = {"popularity": {"source": "aggregates", "half_life_days": half_life_days}}
+
+    incremental = built_recommender("inc", old, config, catalog_rows=rows)
+    assert incremental.popularity_half_life == half_life_days
+    if from_frame:
+        incremental.update(new)
+    else:
+        append_transactions(incremental.engine.url.database, new)
+        incremental.update()
+
+    full = built_recommender("full", rows, config)
+    pd.testing.assert_series_equal(incremental.hybrid_model.popularity.sort_index(),
+                                   full.hybrid_model.popularity.sort_index(), check_names=False, rtol=1e-6)
+    assert_same_recommendations(incremental, full)
+
+
+def test_update_frame_requires_columns(built_recommender, transactions):
+    old, new = split(transactions)
+    recsys = built_recommender("inc", old)
+    with pytest.raises(ValueError, match="quantity"):
+        recsys.update(new.drop(columns="quantity"))
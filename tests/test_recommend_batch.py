@@ -0,0 +1,17 @@
+# tests/test_recommend_batch.py
+"""`recommend_batch` must return, per customer, exactly what `recommend_products` does."""
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("neighbors_k", [None, 5])
+def test_batch_matches_single(built_recommender, transactions, neighbors_k):
+    recsys = built_recommender("db", transactions, {"recommender": {"neighbors_k": neighbors_k}})
+    customers = [3, 1, 2, 40, 999]  # unordered, plus a customer with no history
+    batch = recsys.recommend_batch(customers, top_n=7, block_size=2)
+
+    assert list(dict.fromkeys(batch.customer_id)) == customers
+    for cid in customers:
+        single = recsys.recommend_products(cid, top_n=7)
+        rows = batch[batch.customer_id == cid].drop(columns="customer_id").reset_index(drop=True)
+        pd.testing.assert_frame_equal(rows, single)